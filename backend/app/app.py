@@ -1,8 +1,9 @@
 from flask import Flask
+import atexit
 from flask_cors import CORS
 from controllers.lesson_plan_controller import init_routes
-import psycopg2
-import os
+from database.connection_pool import get_connection_pool
+from services.app_resources import AppResources
 
 app = Flask(__name__)
 CORS(app, resources={
@@ -13,14 +14,12 @@ CORS(app, resources={
     }
 })
 
-# Initialize database connection
-app.db_connection = psycopg2.connect(
-    dbname=os.getenv("POSTGRES_DB"),
-    user=os.getenv("POSTGRES_USER"),
-    password=os.getenv("POSTGRES_PASSWORD"),
-    host=os.getenv("POSTGRES_HOST"),
-    port=os.getenv("POSTGRES_PORT")
-)
+# Initialize the shared database connection pool
+app.db_pool = get_connection_pool()
+
+# Long-lived handles shared by every request
+app.resources = AppResources(app.db_pool)
+atexit.register(app.resources.close)
 
 # Initialize routes
 init_routes(app)
@@ -0,0 +1,83 @@
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import psycopg2
+from dotenv import load_dotenv
+from database.connection_pool import ConnectionPool
+
+load_dotenv()
+
+# The lookup every /generate-plan request makes before prompting
+PREVIOUS_PLANS_QUERY = """
+    SELECT created_at, content, metadata
+    FROM lesson_plans
+    WHERE grade_level = %s AND subject = %s AND user_id = %s
+    ORDER BY created_at DESC
+    LIMIT 5
+"""
+
+def connect_kwargs() -> dict:
+    return {
+        "dbname": os.getenv("POSTGRES_DB"),
+        "user": os.getenv("POSTGRES_USER"),
+        "password": os.getenv("POSTGRES_PASSWORD"),
+        "host": os.getenv("POSTGRES_HOST"),
+        "port": os.getenv("POSTGRES_PORT"),
+    }
+
+def query_with_new_connection() -> None:
+    """One connection per request, as each request's DatabaseManager used to open."""
+    conn = psycopg2.connect(**connect_kwargs())
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(PREVIOUS_PLANS_QUERY, ("3", "Science", 1))
+            cursor.fetchall()
+        conn.commit()
+    finally:
+        conn.close()
+
+def query_with_pool(pool: ConnectionPool) -> None:
+    with pool.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(PREVIOUS_PLANS_QUERY, ("3", "Science", 1))
+        cursor.fetchall()
+
+def run(name: str, fn, requests: int, concurrency: int) -> None:
+    def timed(_) -> float:
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies: List[float] = list(executor.map(timed, range(requests)))
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:<8} {requests / seconds:>12.1f} "
+        f"{statistics.median(latencies) * 1000:>8.2f} {p99 * 1000:>8.2f}"
+    )
+
+def main():
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Compare requests/sec of per-request connections and the shared pool")
+    parser.add_argument("--requests", type=int, default=2000, help="Queries to run per mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent request threads")
+    args = parser.parse_args()
+
+    maxconn = int(os.getenv("POSTGRES_POOL_MAX", 10))
+    pool = ConnectionPool(minconn=int(os.getenv("POSTGRES_POOL_MIN", maxconn)), maxconn=maxconn, **connect_kwargs())
+    try:
+        print(f"{args.requests} requests, {args.concurrency} threads\n")
+        print(f"{'mode':<8} {'requests/sec':>12} {'p50 ms':>8} {'p99 ms':>8}")
+        run("connect", query_with_new_connection, args.requests, args.concurrency)
+        run("pool", lambda: query_with_pool(pool), args.requests, args.concurrency)
+    finally:
+        pool.close()
+
+if __name__ == "__main__":
+    main()
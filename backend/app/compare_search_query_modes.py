@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Tuple
+from services.app_resources import AppResources
+from services.lesson_planner_service import GRADES, SUBJECTS, LessonPlannerAgent
+
+async def search(agent: LessonPlannerAgent, num_results: int) -> Tuple[List[str], float, float]:
+    """Return the retrieved chunk texts, query build time and search time."""
+    start = time.perf_counter()
+    if agent.search_query_mode == "deterministic":
+        search_query = agent.build_search_query()
+    else:
+        search_query = await agent.generate_search_query(
+            f"curriculum objectives for grade {agent.grade_level} {agent.subject}"
+        )
+    query_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = await asyncio.to_thread(agent.search_curriculum, search_query, num_results)
+    search_time = time.perf_counter() - start
+    return list(df["text"]), query_time, search_time
+
+async def compare(resources: AppResources, num_results: int, use_cache: bool) -> None:
+    overlaps = []
+    timings = {"rewrite": [], "deterministic": []}
+
+    print(f"{'grade':<6} {'subject':<32} {'overlap':>8} {'rewrite ms':>11} {'deterministic ms':>17}")
+    for grade in GRADES:
+        for subject in SUBJECTS:
+            results = {}
+            for mode in timings:
+                agent = LessonPlannerAgent(grade, subject, resources, use_cache=use_cache, search_query_mode=mode)
+                texts, query_time, search_time = await search(agent, num_results)
+                results[mode] = set(texts)
+                timings[mode].append((query_time + search_time) * 1000)
+
+            overlap = len(results["rewrite"] & results["deterministic"]) / num_results
+            overlaps.append(overlap)
+            print(f"{grade:<6} {subject:<32} {overlap:>8.2f} {timings['rewrite'][-1]:>11.0f} {timings['deterministic'][-1]:>17.0f}")
+
+    print(f"\nMean overlap@{num_results}: {statistics.mean(overlaps):.2f}")
+    for mode, values in timings.items():
+        print(f"{mode}: p50 {statistics.median(values):.0f} ms, max {max(values):.0f} ms")
+
+def main():
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Compare retrieval overlap and latency of the search query modes")
+    parser.add_argument("--num-results", type=int, default=5, help="Number of chunks retrieved per query")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read memoized query rewrites")
+    args = parser.parse_args()
+
+    resources = AppResources()
+    try:
+        if resources.curriculum_table is None:
+            print("Curriculum table not available")
+            return
+        resources.runtime.run(compare(resources, args.num_results, not args.no_cache))
+    finally:
+        resources.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
-from flask import request, jsonify
-from services.lesson_planner_service import LessonPlannerAgent
+from flask import request, jsonify, Response
+from services.lesson_planner_service import LessonPlannerAgent, validate_grade_and_subject
 from services.user_service import UserService
 from services.report_feedback_service import ReportFeedbackService
+from services.auth.jwks_cache import JWKSCache
+from services.auth.token_cache import VerifiedTokenCache
 from functools import wraps
-import asyncio
 import json
-from urllib.request import urlopen
 from jose import jwt
 from os import environ
 import logging
@@ -19,6 +19,19 @@ AUTH0_DOMAIN = environ.get('AUTH0_DOMAIN')
 AUTH0_AUDIENCE = environ.get('AUTH0_AUDIENCE')
 ALGORITHMS = ["RS256"]
 
+# Signing keys are cached in-process instead of being fetched on every request
+jwks_cache = JWKSCache(
+    f"https://{AUTH0_DOMAIN}/.well-known/jwks.json",
+    ttl=float(environ.get('JWKS_CACHE_TTL', 3600)),
+    refresh_margin=float(environ.get('JWKS_REFRESH_MARGIN', 300))
+)
+
+# Verified claims are reused until the token expires
+token_cache = VerifiedTokenCache(max_size=int(environ.get('TOKEN_CACHE_SIZE', 1024)))
+
+class InvalidPlanRequest(ValueError):
+    """A lesson plan request the client must fix; answered with 400."""
+
 def get_token_auth_header():
     auth = request.headers.get("Authorization", None)
     if not auth:
@@ -42,9 +55,13 @@ def get_token_auth_header():
     logger.debug("Token extracted successfully")
     return token
 
-def get_user_from_token(token):
+def get_user_from_token(token, verified_claims=None):
     try:
-        unverified_claims = jwt.get_unverified_claims(token)
+        # Reuse the claims from jwt.decode when available instead of parsing the token again
+        if verified_claims is not None:
+            unverified_claims = dict(verified_claims)
+        else:
+            unverified_claims = jwt.get_unverified_claims(token)
         logger.debug(f"Token claims: {unverified_claims}")
         
         # Try to get user profile from headers first
@@ -78,74 +95,105 @@ def requires_auth(f):
         if not token:
             return jsonify({"message": "Missing token"}), 401
 
+        profile_header = request.headers.get('X-User-Profile')
+        cached_user = token_cache.get(token, profile_header)
+        if cached_user is not None:
+            request.auth_user = cached_user
+            return f(*args, **kwargs)
+
         try:
-            logger.debug(f"Fetching JWKS from Auth0: https://{AUTH0_DOMAIN}/.well-known/jwks.json")
-            jsonurl = urlopen(f"https://{AUTH0_DOMAIN}/.well-known/jwks.json")
-            jwks = json.loads(jsonurl.read())
             unverified_header = jwt.get_unverified_header(token)
             logger.debug(f"Token header: {unverified_header}")
-            
-            rsa_key = {}
-            for key in jwks["keys"]:
-                if key["kid"] == unverified_header["kid"]:
-                    rsa_key = {
-                        "kty": key["kty"],
-                        "kid": key["kid"],
-                        "use": key["use"],
-                        "n": key["n"],
-                        "e": key["e"]
-                    }
-                    break
-
-            if rsa_key:
-                try:
-                    payload = jwt.decode(
-                        token,
-                        rsa_key,
-                        algorithms=ALGORITHMS,
-                        audience=AUTH0_AUDIENCE,
-                        issuer=f"https://{AUTH0_DOMAIN}/"
-                    )
-                    request.auth_user = get_user_from_token(token)
-                    return f(*args, **kwargs)
-                except jwt.ExpiredSignatureError:
-                    return jsonify({"message": "Token has expired"}), 401
-                except jwt.JWTClaimsError:
-                    return jsonify({"message": "Invalid claims"}), 401
-                except Exception as e:
-                    return jsonify({"message": str(e)}), 401
-            return jsonify({"message": "Unable to find appropriate key"}), 401
+
+            rsa_key = jwks_cache.get_key(unverified_header.get("kid"))
+            if not rsa_key:
+                return jsonify({"message": "Unable to find appropriate key"}), 401
+
+            payload = jwt.decode(
+                token,
+                rsa_key,
+                algorithms=ALGORITHMS,
+                audience=AUTH0_AUDIENCE,
+                issuer=f"https://{AUTH0_DOMAIN}/"
+            )
+        except jwt.ExpiredSignatureError:
+            return jsonify({"message": "Token has expired"}), 401
+        except jwt.JWTClaimsError:
+            return jsonify({"message": "Invalid claims"}), 401
         except Exception as e:
             return jsonify({"message": str(e)}), 401
 
+        request.auth_user = get_user_from_token(token, payload)
+        if request.auth_user:
+            token_cache.put(token, profile_header, request.auth_user)
+        logger.debug(f"Token cache stats: {token_cache.stats()}")
+        return f(*args, **kwargs)
+
     return decorated
 
 def init_routes(app):
     # Initialize services
-    user_service = UserService(app.db_connection)
+    resources = app.resources
+    lesson_plans = resources.db_manager
+    user_service = UserService(resources.pool)
     report_feedback_service = ReportFeedbackService()
 
+    def create_planner():
+        """Build the planner for a /generate-plan request; shared by the JSON and streaming routes."""
+        data = request.get_json(silent=True) or {}
+        grade = data.get('grade')
+        subject = data.get('subject')
+        # Both end up in the curriculum search filter, so only accept the form's values
+        error = validate_grade_and_subject(grade, subject)
+        if error:
+            raise InvalidPlanRequest(error)
+        # Lets a teacher force fresh generations instead of cached stage outputs
+        use_cache = not data.get('bypass_cache', False)
+
+        # Get or create user
+        user_id = user_service.get_or_create_user(request.auth_user)
+
+        return LessonPlannerAgent(grade, subject, resources, use_cache), user_id
+
     @app.route('/generate-plan', methods=['POST'])
     @requires_auth
     def generate_plan():
         try:
-            data = request.get_json()
-            grade = data.get('grade')
-            subject = data.get('subject')
-
-            # Get or create user
-            user_id = user_service.get_or_create_user(request.auth_user)
-
-            planner = LessonPlannerAgent(grade, subject)
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            plan = loop.run_until_complete(planner.generate_daily_plan(user_id))
+            planner, user_id = create_planner()
+            plan = resources.runtime.run(planner.generate_daily_plan(user_id))
 
             return jsonify(plan)
+        except InvalidPlanRequest as e:
+            return jsonify({"message": str(e)}), 400
         except Exception as e:
             logger.error(f"Error generating plan: {str(e)}")
             return jsonify({"message": str(e)}), 500
 
+    @app.route('/generate-plan/stream', methods=['POST'])
+    @requires_auth
+    def generate_plan_stream():
+        """Server-Sent Events variant of /generate-plan."""
+        try:
+            planner, user_id = create_planner()
+        except InvalidPlanRequest as e:
+            return jsonify({"message": str(e)}), 400
+        except Exception as e:
+            logger.error(f"Error generating plan: {str(e)}")
+            return jsonify({"message": str(e)}), 500
+
+        def events():
+            try:
+                for event in resources.runtime.iterate(planner.generate_daily_plan_stream(user_id)):
+                    yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+            except Exception as e:
+                logger.error(f"Error streaming plan: {str(e)}")
+                yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+
+        return Response(events(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
     @app.route('/lesson-plans', methods=['GET'])
     @requires_auth
     def get_lesson_plans():
@@ -153,8 +201,7 @@ def init_routes(app):
             # Get or create user
             user_id = user_service.get_or_create_user(request.auth_user)
             
-            planner = LessonPlannerAgent(None, None)
-            plans = planner.db_manager.get_all_lesson_plans(user_id)
+            plans = lesson_plans.get_all_lesson_plans(user_id)
             
             # Ensure each plan has a title
             for plan in plans:
@@ -173,8 +220,7 @@ def init_routes(app):
             # Get or create user
             user_id = user_service.get_or_create_user(request.auth_user)
             
-            planner = LessonPlannerAgent(None, None)
-            plan = planner.db_manager.get_lesson_plan_by_id(plan_id, user_id)
+            plan = lesson_plans.get_lesson_plan_by_id(plan_id, user_id)
             if plan is None:
                 return jsonify({'error': 'Lesson plan not found'}), 404
             
@@ -195,8 +241,7 @@ def init_routes(app):
             user_id = user_service.get_or_create_user(request.auth_user)
             
             data = request.get_json()
-            planner = LessonPlannerAgent(None, None)
-            updated_plan = planner.db_manager.update_lesson_plan(plan_id, data, user_id)
+            updated_plan = lesson_plans.update_lesson_plan(plan_id, data, user_id)
             if updated_plan is None:
                 return jsonify({'error': 'Failed to update lesson plan'}), 404
             return jsonify(updated_plan)
@@ -223,19 +268,15 @@ def init_routes(app):
             feedback = data['feedback']
             options = data.get('options', {})
             
-            # Get user info from token
-            token = get_token_auth_header()
-            user = get_user_from_token(token)
+            # User info was already resolved by requires_auth
+            user = request.auth_user
             
             logger.debug(f"Refining feedback for user: {user.get('email', 'unknown')}")
             
-            # Refine the feedback
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            refined_feedback = loop.run_until_complete(
+            # Refine the feedback on the shared event loop
+            refined_feedback = resources.runtime.run(
                 report_feedback_service.refine_feedback(feedback, options)
             )
-            loop.close()
             
             return jsonify(refined_feedback), 200
             
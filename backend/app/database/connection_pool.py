@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL connection pool.
+
+    Connections are borrowed for one unit of work through `connection()`,
+    committed on success, rolled back on error and returned to the pool.
+    Callers block while all `maxconn` connections are in use. A connection
+    that has been idle longer than `healthcheck_interval` is pinged before
+    it is handed out and replaced if it has gone stale.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, healthcheck_interval: float = 30, **connect_kwargs):
+        self.maxconn = maxconn
+        self.healthcheck_interval = healthcheck_interval
+        self._pool = ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used: Dict[int, float] = {}
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        pass
+                raise
+            finally:
+                self._release(conn)
+        finally:
+            self._slots.release()
+
+    def _checkout(self):
+        for _ in range(self.maxconn + 1):
+            conn = self._pool.getconn()
+            if not self._needs_check(conn) or self._is_healthy(conn):
+                return conn
+            # Drop the stale connection; the pool opens a fresh one in its place
+            self._release(conn, close=True)
+        raise psycopg2.OperationalError("Could not obtain a healthy database connection")
+
+    def _needs_check(self, conn) -> bool:
+        last_used = self._last_used.get(id(conn))
+        return bool(conn.closed) or (
+            last_used is not None and time.monotonic() - last_used > self.healthcheck_interval
+        )
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _release(self, conn, close: bool = False) -> None:
+        close = close or bool(conn.closed)
+        if close:
+            self._last_used.pop(id(conn), None)
+        else:
+            self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn, close=close)
+
+    def close(self) -> None:
+        self._pool.closeall()
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_connection_pool() -> ConnectionPool:
+    """
+    Return the process-wide pool, creating it on first use.
+
+    Raises psycopg2.OperationalError if PostgreSQL is unreachable, so the
+    app fails at startup instead of on every request.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                maxconn = int(os.getenv("POSTGRES_POOL_MAX", 10))
+                # psycopg2 closes a returned connection once minconn are idle, so
+                # anything below maxconn reconnects on every overlapping request
+                _pool = ConnectionPool(
+                    minconn=int(os.getenv("POSTGRES_POOL_MIN", maxconn)),
+                    maxconn=maxconn,
+                    healthcheck_interval=float(os.getenv("POSTGRES_POOL_HEALTHCHECK_INTERVAL", 30)),
+                    dbname=os.getenv("POSTGRES_DB"),
+                    user=os.getenv("POSTGRES_USER"),
+                    password=os.getenv("POSTGRES_PASSWORD"),
+                    host=os.getenv("POSTGRES_HOST"),
+                    port=os.getenv("POSTGRES_PORT")
+                )
+    return _pool
@@ -1,9 +1,10 @@
 import os
-import psycopg2
 from psycopg2.extras import Json
 import lancedb
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
+from .connection_pool import ConnectionPool, get_connection_pool
+from utils.embedding_cache import CachedOpenAIEmbeddings  # noqa: F401 registers "openai-cached"
 
 # Load environment variables
 load_dotenv()
@@ -12,8 +13,8 @@ load_dotenv()
 LANCEDB_PATH = os.getenv("LANCEDB_PATH", "../database/vectordb/data/lancedb")
 
 class DatabaseManager:
-    def __init__(self):
-        self.conn = self._connect_to_db()
+    def __init__(self, pool: Optional[ConnectionPool] = None):
+        self.pool = pool or get_connection_pool()
         self._init_vectordb()
 
     def _init_vectordb(self):
@@ -33,26 +34,61 @@ class DatabaseManager:
             self.db = None
             self.curriculum_table = None
 
-    def _connect_to_db(self):
-        """Connect to PostgreSQL database."""
+    def get_curriculum_table_version(self) -> Optional[int]:
+        """Version of the curriculum table this process is searching."""
+        if self.curriculum_table is None:
+            return None
+        try:
+            return self.curriculum_table.version
+        except Exception as e:
+            print(f"Error getting curriculum table version: {str(e)}")
+            return None
+
+    def get_curriculum_analysis(self, grade_level: str, subject: str, table_version: int) -> Optional[str]:
+        if self.pool is None:
+            return None
+
         try:
-            return psycopg2.connect(
-                dbname=os.getenv("POSTGRES_DB"),
-                user=os.getenv("POSTGRES_USER"),
-                password=os.getenv("POSTGRES_PASSWORD"),
-                host=os.getenv("POSTGRES_HOST"),
-                port=os.getenv("POSTGRES_PORT")
-            )
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT analysis
+                    FROM curriculum_analysis
+                    WHERE grade_level = %s AND subject = %s AND table_version = %s
+                    """,
+                    (grade_level, subject, table_version)
+                )
+                result = cursor.fetchone()
+                return result[0] if result else None
         except Exception as e:
-            print(f"Warning: Could not connect to PostgreSQL database: {str(e)}")
+            print(f"Error getting curriculum analysis: {str(e)}")
             return None
 
+    def save_curriculum_analysis(self, grade_level: str, subject: str, table_version: int, analysis: str) -> None:
+        if self.pool is None:
+            raise Exception("Database connection is not available")
+
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO curriculum_analysis (grade_level, subject, table_version, analysis)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (grade_level, subject, table_version) DO UPDATE
+                    SET analysis = EXCLUDED.analysis, created_at = CURRENT_TIMESTAMP
+                    """,
+                    (grade_level, subject, table_version, analysis)
+                )
+        except Exception as e:
+            print(f"Error saving curriculum analysis: {str(e)}")
+            raise
+
     def load_lesson_templates(self) -> List[Dict]:
-        if self.conn is None:
+        if self.pool is None:
             return []
             
         try:
-            with self.conn.cursor() as cursor:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
                 cursor.execute("SELECT data FROM lesson_templates WHERE id = 1")
                 result = cursor.fetchone()
                 return result[0] if result else []
@@ -61,11 +97,11 @@ class DatabaseManager:
             return []
 
     def get_previous_plans(self, grade_level: str, subject: str, user_id: int, limit: int = 5) -> List[Dict]:
-        if self.conn is None:
+        if self.pool is None:
             return []
             
         try:
-            with self.conn.cursor() as cursor:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(
                     """
                     SELECT created_at, content, metadata 
@@ -90,11 +126,11 @@ class DatabaseManager:
             return []
 
     def get_all_lesson_plans(self, user_id: int) -> List[Dict]:
-        if self.conn is None:
+        if self.pool is None:
             return []
             
         try:
-            with self.conn.cursor() as cursor:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(
                     """
                     SELECT id, created_at, updated_at, grade_level, subject, content, metadata, title
@@ -123,11 +159,11 @@ class DatabaseManager:
             return []
 
     def get_lesson_plan_by_id(self, plan_id: int, user_id: int) -> Optional[Dict]:
-        if self.conn is None:
+        if self.pool is None:
             return None
             
         try:
-            with self.conn.cursor() as cursor:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(
                     """
                     SELECT id, created_at, updated_at, grade_level, subject, content, metadata, title
@@ -154,11 +190,11 @@ class DatabaseManager:
             return None
 
     def save_plan(self, plan: Dict, user_id: int) -> int:
-        if self.conn is None:
+        if self.pool is None:
             raise Exception("Database connection is not available")
             
         try:
-            with self.conn.cursor() as cursor:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(
                     """
                     INSERT INTO lesson_plans (grade_level, subject, content, metadata, title, user_id)
@@ -174,21 +210,17 @@ class DatabaseManager:
                         user_id
                     )
                 )
-                plan_id = cursor.fetchone()[0]
-                self.conn.commit()
-                return plan_id
+                return cursor.fetchone()[0]
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
             print(f"Error saving plan: {str(e)}")
             raise
 
     def update_lesson_plan(self, plan_id: int, plan_data: Dict, user_id: int) -> Optional[Dict]:
-        if self.conn is None:
+        if self.pool is None:
             return None
             
         try:
-            with self.conn.cursor() as cursor:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
                 # First check if the plan exists and belongs to the user
                 cursor.execute(
                     "SELECT id FROM lesson_plans WHERE id = %s AND user_id = %s",
@@ -216,31 +248,26 @@ class DatabaseManager:
                     update_fields.append("subject = %s")
                     values.append(plan_data["subject"])
 
-                if not update_fields:
-                    return self.get_lesson_plan_by_id(plan_id, user_id)
-
-                # Add updated_at timestamp
-                update_fields.append("updated_at = CURRENT_TIMESTAMP")
+                if update_fields:
+                    # Add updated_at timestamp
+                    update_fields.append("updated_at = CURRENT_TIMESTAMP")
 
-                # Add the plan_id to the values list
-                values.append(plan_id)
-                values.append(user_id)
+                    # Add the plan_id to the values list
+                    values.append(plan_id)
+                    values.append(user_id)
 
-                # Execute the update
-                cursor.execute(
-                    f"""
-                    UPDATE lesson_plans
-                    SET {", ".join(update_fields)}
-                    WHERE id = %s AND user_id = %s
-                    """,
-                    tuple(values)
-                )
-                self.conn.commit()
+                    # Execute the update
+                    cursor.execute(
+                        f"""
+                        UPDATE lesson_plans
+                        SET {", ".join(update_fields)}
+                        WHERE id = %s AND user_id = %s
+                        """,
+                        tuple(values)
+                    )
 
-                # Return the updated plan
-                return self.get_lesson_plan_by_id(plan_id, user_id)
+            # Return the updated plan once the connection is back in the pool
+            return self.get_lesson_plan_by_id(plan_id, user_id)
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
             print(f"Error updating lesson plan: {str(e)}")
             return None
\ No newline at end of file
@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+from services.app_resources import AppResources
+from services.lesson_planner_service import GRADES, SUBJECTS, LessonPlannerAgent
+from services.prompt_chains.lesson_plan_chain import LessonPlanChain
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+async def precompute(resources: AppResources, grade: str, subject: str, table_version: int, force: bool) -> bool:
+    db_manager = resources.db_manager
+    if not force and await asyncio.to_thread(db_manager.get_curriculum_analysis, grade, subject, table_version):
+        logger.info(f"Skipping Grade {grade} {subject}: already computed for table version {table_version}")
+        return True
+
+    try:
+        agent = LessonPlannerAgent(grade, subject, resources)
+        curriculum_query = f"curriculum objectives for grade {grade} {subject}"
+        curriculum_context = await agent._get_curriculum_context(curriculum_query)
+        if not curriculum_context:
+            logger.warning(f"No curriculum context found for Grade {grade} {subject}")
+            return False
+
+        chain = LessonPlanChain(resources.llm, resources.stage_cache)
+        analysis = await chain._analyze_curriculum_requirements(grade, subject, curriculum_context)
+
+        await asyncio.to_thread(db_manager.save_curriculum_analysis, grade, subject, table_version, analysis)
+        logger.info(f"Stored curriculum analysis for Grade {grade} {subject}")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to precompute Grade {grade} {subject}: {str(e)}")
+        return False
+
+async def precompute_all(resources: AppResources, force: bool) -> int:
+    table_version = resources.db_manager.get_curriculum_table_version()
+    if table_version is None:
+        logger.error("Curriculum table not available, nothing to precompute")
+        return 0
+
+    # LLMClient caps how many of these run against OpenAI at once
+    results = await asyncio.gather(*[
+        precompute(resources, grade, subject, table_version, force)
+        for grade in GRADES
+        for subject in SUBJECTS
+    ])
+    return sum(results)
+
+def main():
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Precompute curriculum analysis for every grade and subject")
+    parser.add_argument("--force", action="store_true", help="Recompute analyses that already exist for the current table version")
+    args = parser.parse_args()
+
+    resources = AppResources()
+    try:
+        succeeded = resources.runtime.run(precompute_all(resources, args.force))
+        logger.info(f"Precomputed {succeeded} of {len(GRADES) * len(SUBJECTS)} grade and subject combinations")
+    finally:
+        resources.close()
+
+if __name__ == "__main__":
+    main()
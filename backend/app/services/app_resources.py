@@ -0,0 +1,67 @@
+import threading
+from typing import Dict, List, Optional
+from database.connection_pool import ConnectionPool, get_connection_pool
+from database.db_manager import DatabaseManager
+from utils.async_runtime import AsyncRuntime
+from utils.logger import setup_logger
+from .integrations.educational_apis import YouTubeEducationalAPI
+from .llm_client import LLMClient
+from .prompt_chains.lesson_plan_chain import LessonPlanChain
+from .prompt_chains.stage_cache import create_stage_cache
+from .prompt_chains.token_budget import get_encoding
+
+# Set up logging
+logger = setup_logger()
+
+class AppResources:
+    """
+    Application-scoped registry of long-lived handles.
+
+    Created once at startup and shared by every request, so per-request
+    objects only carry request data (grade, subject, user) and never
+    reconnect to Postgres or LanceDB.
+    """
+
+    def __init__(self, pool: Optional[ConnectionPool] = None):
+        self.pool = pool or get_connection_pool()
+        # One event loop for the whole process so async clients outlive a request
+        self.runtime = AsyncRuntime()
+        # Repository for lesson plans plus the LanceDB curriculum table
+        self.db_manager = DatabaseManager(self.pool)
+        self.youtube_api = YouTubeEducationalAPI()
+        self.llm = LLMClient()
+        # Disk-backed, shared by every worker process on the host
+        self.stage_cache = create_stage_cache()
+        # Load the prompt tokenizer now so the first request doesn't wait on its download
+        get_encoding(LessonPlanChain.MODEL)
+        self._lesson_templates: Optional[List[Dict]] = None
+        self._templates_lock = threading.Lock()
+        logger.info("Application resources initialized")
+
+    @property
+    def curriculum_table(self):
+        return self.db_manager.curriculum_table
+
+    @property
+    def lesson_templates(self) -> List[Dict]:
+        """Lesson templates are static seed data, so they are loaded once."""
+        if self._lesson_templates is None:
+            with self._templates_lock:
+                if self._lesson_templates is None:
+                    templates = self.db_manager.load_lesson_templates()
+                    if not templates:
+                        # Don't pin an empty result from a transient failure
+                        return templates
+                    self._lesson_templates = templates
+        return self._lesson_templates
+
+    def close(self) -> None:
+        """Release pooled connections and async clients at shutdown."""
+        try:
+            self.runtime.run(self.youtube_api.close(), timeout=5)
+            self.runtime.run(self.llm.close(), timeout=5)
+        except Exception as e:
+            logger.warning(f"Error closing async clients: {str(e)}")
+        self.runtime.stop()
+        if self.pool is not None:
+            self.pool.close()
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+from typing import Dict, Optional
+from urllib.request import urlopen
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+class JWKSCache:
+    """
+    In-process store of Auth0 signing keys indexed by `kid`.
+
+    Keys are fetched once and served from memory for `ttl` seconds. When a
+    lookup happens inside the `refresh_margin` window before expiry, a refresh
+    is started on a background thread so requests never wait on Auth0. An
+    unknown `kid` triggers one synchronous refetch (key rotation), and if a
+    refresh fails the previously fetched keys keep being served.
+    """
+
+    def __init__(self, jwks_url: str, ttl: float = 3600, refresh_margin: float = 300,
+                 timeout: float = 5, min_refetch_interval: float = 30):
+        self.jwks_url = jwks_url
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl)
+        self.timeout = timeout
+        self.min_refetch_interval = min_refetch_interval
+
+        self._keys: Dict[str, Dict] = {}
+        self._fetched_at = 0.0
+        self._last_attempt: Optional[float] = None
+        self._fetch_lock = threading.Lock()
+        self._background_lock = threading.Lock()
+
+    def get_key(self, kid: str) -> Optional[Dict]:
+        """Return the RSA key for `kid`, or None if Auth0 does not publish it."""
+        if not self._keys:
+            if self._can_refetch():
+                self._refresh()
+        elif self._age() >= self.ttl - self.refresh_margin and self._can_refetch():
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and self._can_refetch():
+            # Unknown kid: Auth0 may have rotated its signing keys
+            logger.info(f"Unknown JWKS kid {kid}, refetching keys")
+            self._refresh()
+            key = self._keys.get(kid)
+        return key
+
+    def _can_refetch(self) -> bool:
+        # Throttle fetches so failures or bogus kids cannot hammer Auth0
+        return self._last_attempt is None or \
+            time.monotonic() - self._last_attempt >= self.min_refetch_interval
+
+    def _age(self) -> float:
+        return time.monotonic() - self._fetched_at
+
+    def _refresh_in_background(self) -> None:
+        if not self._background_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self._refresh()
+            finally:
+                self._background_lock.release()
+
+        threading.Thread(target=run, name="jwks-refresh", daemon=True).start()
+
+    def _refresh(self) -> None:
+        seen_attempt = self._last_attempt
+        with self._fetch_lock:
+            if self._last_attempt != seen_attempt:
+                # Another thread fetched while we were waiting for the lock
+                return
+            self._last_attempt = time.monotonic()
+            try:
+                logger.debug(f"Fetching JWKS from {self.jwks_url}")
+                with urlopen(self.jwks_url, timeout=self.timeout) as response:
+                    jwks = json.loads(response.read())
+                self._keys = {
+                    key["kid"]: {
+                        "kty": key["kty"],
+                        "kid": key["kid"],
+                        "use": key["use"],
+                        "n": key["n"],
+                        "e": key["e"]
+                    }
+                    for key in jwks.get("keys", [])
+                    if key.get("kty") == "RSA"
+                }
+                self._fetched_at = time.monotonic()
+            except Exception as e:
+                # Keep serving the stale keys; the next lookup will retry
+                if self._keys:
+                    logger.warning(f"JWKS refresh failed, serving cached keys: {str(e)}")
+                else:
+                    logger.error(f"JWKS fetch failed: {str(e)}")
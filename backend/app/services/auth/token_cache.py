@@ -0,0 +1,66 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified bearer tokens.
+
+    Entries are keyed by a SHA-256 of the token and the X-User-Profile header,
+    hold the verified claims merged with the profile, and expire at the
+    token's `exp` claim. A hit skips signature verification and claim parsing.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str, profile_header: Optional[str]) -> str:
+        return hashlib.sha256(f"{token}\0{profile_header or ''}".encode("utf-8")).hexdigest()
+
+    def get(self, token: str, profile_header: Optional[str] = None) -> Optional[Dict]:
+        key = self._key(token, profile_header)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers may mutate the claims, so never hand out the cached dict
+        return dict(claims)
+
+    def put(self, token: str, profile_header: Optional[str], claims: Dict) -> None:
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+
+        key = self._key(token, profile_header)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
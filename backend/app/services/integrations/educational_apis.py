@@ -1,6 +1,6 @@
 import aiohttp
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 from utils.logger import setup_logger
 
 logger = setup_logger()
@@ -10,6 +10,17 @@ class YouTubeEducationalAPI:
         self.api_key = os.getenv("YOUTUBE_API_KEY")
         if not self.api_key:
             logger.warning("YouTube API key not found in environment variables")
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so it binds to the long-lived application event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
 
     async def search_videos(self, topic: str, grade_level: str, max_results: int = 5) -> List[Dict]:
         """
@@ -23,43 +34,43 @@ class YouTubeEducationalAPI:
         Returns:
             List of video details including title, description, and URL
         """
-        async with aiohttp.ClientSession() as session:
-            try:
-                params = {
-                    'part': 'snippet',
-                    'q': f'education grade {grade_level} {topic}',
-                    'videoCategoryId': '27',  # Education category
-                    'type': 'video',
-                    'maxResults': max_results,
-                    'key': self.api_key,
-                    'relevanceLanguage': 'en',
-                    'safeSearch': 'strict'
-                }
-                
-                async with session.get(
-                    'https://www.googleapis.com/youtube/v3/search', 
-                    params=params
-                ) as response:
-                    if response.status != 200:
-                        logger.error(f"YouTube API error: {response.status}")
-                        return []
-                        
-                    data = await response.json()
-                    videos = [
-                        {
-                            'title': item['snippet']['title'],
-                            'description': item['snippet']['description'],
-                            'thumbnail': item['snippet']['thumbnails']['default']['url'],
-                            'url': f"https://www.youtube.com/watch?v={item['id']['videoId']}",
-                            'published_at': item['snippet']['publishedAt']
-                        }
-                        for item in data.get('items', [])
-                    ]
+        session = self._get_session()
+        try:
+            params = {
+                'part': 'snippet',
+                'q': f'education grade {grade_level} {topic}',
+                'videoCategoryId': '27',  # Education category
+                'type': 'video',
+                'maxResults': max_results,
+                'key': self.api_key,
+                'relevanceLanguage': 'en',
+                'safeSearch': 'strict'
+            }
+            
+            async with session.get(
+                'https://www.googleapis.com/youtube/v3/search', 
+                params=params
+            ) as response:
+                if response.status != 200:
+                    logger.error(f"YouTube API error: {response.status}")
+                    return []
                     
-                    logger.info(f"Found {len(videos)} educational videos for {topic}")
-                    return videos
-                    
-            except Exception as e:
-                logger.error(f"Error fetching YouTube videos: {str(e)}")
-                return []
+                data = await response.json()
+                videos = [
+                    {
+                        'title': item['snippet']['title'],
+                        'description': item['snippet']['description'],
+                        'thumbnail': item['snippet']['thumbnails']['default']['url'],
+                        'url': f"https://www.youtube.com/watch?v={item['id']['videoId']}",
+                        'published_at': item['snippet']['publishedAt']
+                    }
+                    for item in data.get('items', [])
+                ]
+                
+                logger.info(f"Found {len(videos)} educational videos for {topic}")
+                return videos
+                
+        except Exception as e:
+            logger.error(f"Error fetching YouTube videos: {str(e)}")
+            return []
 
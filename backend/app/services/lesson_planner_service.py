@@ -1,28 +1,70 @@
 import os
+import asyncio
 from dotenv import load_dotenv
 import json
-from typing import Dict, List
-from database.db_manager import DatabaseManager
+from typing import AsyncIterator, Dict, List, Optional
 from utils.logger import setup_logger
+from utils.search import SEARCH_MODE, search_chunks
 import openai
+from .app_resources import AppResources
 from .prompt_chains.lesson_plan_chain import LessonPlanChain
-from .integrations.educational_apis import YouTubeEducationalAPI
+from .prompt_chains.stage_cache import cached_completion
 
 # Load environment variables
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# "rewrite" asks an LLM to phrase the vector search query, "deterministic" builds it from grade and subject
+SEARCH_QUERY_MODE = os.getenv("SEARCH_QUERY_MODE", "rewrite")
+SEARCH_QUERY_MODEL = "gpt-4"
+
 # Set up logging
 logger = setup_logger()
 
+# Grade and subject values exactly as the lesson plan form sends them
+GRADES = ["K"] + [str(grade) for grade in range(1, 10)]
+SUBJECTS = [
+    "Mathematics",
+    "Science",
+    "English Language Arts",
+    "Social Studies",
+    "Arts Education",
+    "Physical and Health Education"
+]
+
+def validate_grade_and_subject(grade_level, subject) -> Optional[str]:
+    """Return an error message unless grade and subject are values the lesson plan form offers."""
+    if grade_level not in GRADES:
+        return f"grade must be one of {', '.join(GRADES)}"
+    if subject not in SUBJECTS:
+        return f"subject must be one of {', '.join(SUBJECTS)}"
+    return None
+
+def sql_string(value: str) -> str:
+    """Quote a value for a LanceDB where clause."""
+    return "'" + value.replace("'", "''") + "'"
+
+def normalize_grade_level(grade_level: str) -> str:
+    """Map a grade from the lesson plan form to the value stored with curriculum chunks."""
+    grade = str(grade_level).strip()
+    return "Kindergarten" if grade.upper() in ("K", "KINDERGARTEN") else grade
+
+def normalize_subject_area(subject: str) -> str:
+    """Map a subject from the lesson plan form, e.g. "Physical and Health Education", to its stored slug."""
+    words = [word for word in subject.strip().lower().split() if word != "and"]
+    return "-".join(words)
+
 class LessonPlannerAgent:
-    def __init__(self, grade_level: str, subject: str):
+    def __init__(self, grade_level: str, subject: str, resources: AppResources, use_cache: bool = True,
+                 search_query_mode: str = SEARCH_QUERY_MODE, retrieval_mode: str = SEARCH_MODE):
+        # Only request data lives here; shared handles come from the registry
         self.grade_level = grade_level
         self.subject = subject
-        self.db_manager = DatabaseManager()
-        self.lesson_templates = self.db_manager.load_lesson_templates()
-        self.prompt_chain = LessonPlanChain()
-        self.youtube_api = YouTubeEducationalAPI()
+        self.resources = resources
+        self.use_cache = use_cache
+        self.search_query_mode = search_query_mode
+        self.retrieval_mode = retrieval_mode
+        self.db_manager = resources.db_manager
 
     def _create_context_prompt(self, previous_plans: List[Dict]) -> str:
         if not previous_plans:
@@ -38,21 +80,33 @@ class LessonPlannerAgent:
                 context += f"Content: {json.dumps(plan['content'], indent=2)[:500]}...\n"
         return context
 
+    def _get_precomputed_analysis(self) -> Optional[str]:
+        table_version = self.db_manager.get_curriculum_table_version()
+        if table_version is None:
+            return None
+        analysis = self.db_manager.get_curriculum_analysis(self.grade_level, self.subject, table_version)
+        if analysis is not None:
+            logger.info(f"Using precomputed curriculum analysis for Grade {self.grade_level} {self.subject}")
+        return analysis
+
     async def _get_curriculum_context(self, query: str, num_results: int = 5) -> str:
         if self.db_manager.curriculum_table is None:
             logger.warning("Curriculum table not available, returning empty context")
             return ""
             
         try:
-            search_query = await self.generate_search_query(query)
-            results = self.db_manager.curriculum_table.search(query=search_query).limit(num_results)
-            df = results.to_pandas()
+            if self.search_query_mode == "deterministic":
+                search_query = self.build_search_query()
+            else:
+                search_query = await self.generate_search_query(query)
+            # Query embedding and vector search block, so keep them off the shared event loop
+            df = await asyncio.to_thread(self.search_curriculum, search_query, num_results)
             
             contexts = []
             for _, row in df.iterrows():
                 text = row['text']
-                metadata = row['metadata']
-                source = f"\nSource: {metadata.get('filename', 'Unknown')}"
+                metadata = row['metadata'] if 'metadata' in row else row
+                source = f"\nSource: {metadata.get('section_type') or 'Unknown'}"
                 contexts.append(f"{text}{source}")
                 
             return "\n\n".join(contexts)
@@ -60,15 +114,34 @@ class LessonPlannerAgent:
             logger.error(f"Error getting curriculum context: {str(e)}")
             return ""
     
+    def search_curriculum(self, search_query: str, num_results: int, retrieval_mode: Optional[str] = None):
+        """Vector or hybrid search restricted to this agent's grade and subject."""
+        retrieval_mode = retrieval_mode or self.retrieval_mode
+        table = self.db_manager.curriculum_table
+        # Tables ingested before metadata was flattened keep it in a nested struct
+        prefix = "" if "grade_level" in table.schema.names else "metadata."
+        where = (
+            f"{prefix}grade_level = {sql_string(normalize_grade_level(self.grade_level))} "
+            f"AND {prefix}subject_area = {sql_string(normalize_subject_area(self.subject))}"
+        )
+
+        return search_chunks(table, search_query, num_results, where=where, mode=retrieval_mode)
+
+    def build_search_query(self) -> str:
+        """Build the search query from grade and subject without an LLM call."""
+        # Mirrors the "{grade} {subject} {section}:" prefix that ingestion puts on every chunk
+        return f"{normalize_grade_level(self.grade_level)} {self.subject} Big Ideas Curricular Competencies Content learning standards"
+
     async def generate_search_query(self, context: str) -> str:
-        response = openai.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are helping to search BC curriculum documents. Convert the context into a focused search query."},
-                {"role": "user", "content": f"Generate a search query for: Grade {self.grade_level} {self.subject} curriculum guidance about: {context}"}
-            ]
+        messages = [
+            {"role": "system", "content": "You are helping to search BC curriculum documents. Convert the context into a focused search query."},
+            {"role": "user", "content": f"Generate a search query for: Grade {self.grade_level} {self.subject} curriculum guidance about: {context}"}
+        ]
+
+        # Rewrites are memoized persistently, keyed by model and input
+        return await cached_completion(
+            self.resources.llm, self.resources.stage_cache, SEARCH_QUERY_MODEL, "search_query", messages, self.use_cache
         )
-        return response.choices[0].message.content
 
     
     async def generate_lesson_plan(prompt: str) -> Dict:
@@ -82,34 +155,67 @@ class LessonPlannerAgent:
         return response.choices[0].message.content
 
     async def generate_daily_plan(self, user_id: int) -> Dict:
+        plan = None
+        async for event in self.generate_daily_plan_stream(user_id):
+            if event["event"] == "plan":
+                plan = event["data"]
+        return plan
+
+    async def generate_daily_plan_stream(self, user_id: int) -> AsyncIterator[Dict]:
+        """
+        Generate and save a lesson plan, yielding progress events as each
+        step finishes. The last event is `plan` with the saved plan.
+        """
         logger.info(f"Generating lesson plan for Grade {self.grade_level} {self.subject}")
 
         # Get previous plans for context
-        previous_plans = self.db_manager.get_previous_plans(self.grade_level, self.subject, user_id)
+        previous_plans = await asyncio.to_thread(
+            self.db_manager.get_previous_plans, self.grade_level, self.subject, user_id
+        )
         context_prompt = self._create_context_prompt(previous_plans)
         
-        # Get curriculum context based on grade and subject
-        curriculum_query = f"curriculum objectives for grade {self.grade_level} {self.subject}"
-        curriculum_context = await self._get_curriculum_context(curriculum_query)
+        # A precomputed analysis takes the vector search and first LLM stage off the request,
+        # unless the teacher asked for a fresh generation
+        curriculum_analysis = None
+        if self.use_cache:
+            curriculum_analysis = await asyncio.to_thread(self._get_precomputed_analysis)
+        if curriculum_analysis is None:
+            # Get curriculum context based on grade and subject
+            curriculum_query = f"curriculum objectives for grade {self.grade_level} {self.subject}"
+            curriculum_context = await self._get_curriculum_context(curriculum_query)
+        else:
+            curriculum_context = ""
+        yield {"event": "stage", "data": {"stage": "curriculum_context"}}
 
         # Get lesson plan templates - ensure it's a dictionary
-        templates = {"templates": self.lesson_templates} if isinstance(self.lesson_templates, list) else self.lesson_templates
+        lesson_templates = await asyncio.to_thread(lambda: self.resources.lesson_templates)
+        templates = {"templates": lesson_templates} if isinstance(lesson_templates, list) else lesson_templates
         
         # Get educational videos for the lesson
-        educational_videos = await self.youtube_api.search_videos(
+        educational_videos = await self.resources.youtube_api.search_videos(
             topic=self.subject,
             grade_level=f"grade {self.grade_level}"
         )
+        yield {"event": "stage", "data": {"stage": "video_resources", "content": educational_videos}}
+
+        # The chain keeps per-run conversation history, so each plan gets its own
+        prompt_chain = LessonPlanChain(self.resources.llm, self.resources.stage_cache, self.use_cache)
 
         # Execute prompt chain with video resources
-        chain_result = await self.prompt_chain.execute_chain(
+        chain_result = None
+        async for event in prompt_chain.execute_chain_stream(
             grade_level=self.grade_level,
             subject=self.subject,
             curriculum_context=curriculum_context,
             previous_context=context_prompt,
             templates=templates,
-            video_resources=educational_videos
-        )
+            video_resources=educational_videos,
+            curriculum_analysis=curriculum_analysis
+        ):
+            if event["event"] == "complete":
+                chain_result = event["data"]
+            else:
+                yield event
         
         # Create structured plan
         plan = {
@@ -124,7 +230,7 @@ class LessonPlannerAgent:
         }
 
         # Save the plan and get its ID
-        plan_id = self.db_manager.save_plan(plan, user_id)
+        plan_id = await asyncio.to_thread(self.db_manager.save_plan, plan, user_id)
         plan["id"] = plan_id
         
-        return plan
\ No newline at end of file
+        yield {"event": "plan", "data": plan}
\ No newline at end of file
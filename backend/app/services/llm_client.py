@@ -0,0 +1,56 @@
+import asyncio
+import os
+from typing import AsyncIterator, Dict, List, Optional
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+# Load environment variables
+load_dotenv()
+
+class LLMClient:
+    """
+    Shared AsyncOpenAI client for chat completions.
+
+    Calls never block the event loop, so independent stages really run in
+    parallel. A semaphore caps the number of in-flight requests across the
+    whole process and every call gets a timeout.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, timeout: Optional[float] = None):
+        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.max_concurrency = max_concurrency or int(os.getenv("OPENAI_MAX_CONCURRENCY", 8))
+        self.timeout = timeout or float(os.getenv("OPENAI_TIMEOUT_SECONDS", 60))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the loop that runs the calls
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def complete(self, model: str, messages: List[Dict], timeout: Optional[float] = None, **kwargs) -> str:
+        async with self._get_semaphore():
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                timeout=timeout or self.timeout,
+                **kwargs
+            )
+        return response.choices[0].message.content
+
+    async def stream(self, model: str, messages: List[Dict], timeout: Optional[float] = None, **kwargs) -> AsyncIterator[str]:
+        """Yield the completion text as it is generated."""
+        async with self._get_semaphore():
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                timeout=timeout or self.timeout,
+                stream=True,
+                **kwargs
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    async def close(self) -> None:
+        await self.client.close()
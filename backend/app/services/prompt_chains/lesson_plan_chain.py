@@ -1,29 +1,62 @@
 import asyncio
-from typing import Dict, List
-import openai
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from services.llm_client import LLMClient
+from .stage_cache import StageCache, cached_completion
+from .token_budget import STAGE_TOKEN_BUDGETS, ContextSource, TokenBudget
 from utils.formatters.video_formatter import VideoFormatter
 from utils.formatters.response_formatter import strip_markdown_code_blocks
 from utils.logger import setup_logger
 
 logger = setup_logger()
 
+# Most of the final prompt the previous plans may take
+PREVIOUS_CONTEXT_MAX_TOKENS = 1000
+
 class LessonPlanChain:
-    def __init__(self):
+    MODEL = "gpt-4o-mini"
+
+    def __init__(self, llm: LLMClient, cache: Optional[StageCache] = None, use_cache: bool = True):
+        self.llm = llm
+        # Cached stage outputs are still written when use_cache is off, just never read
+        self.cache = cache
+        self.use_cache = use_cache
         self.conversation_history = []
         self.video_formatter = VideoFormatter()
+        self.token_budget = TokenBudget(self.MODEL)
         logger.info("Initializing LessonPlanChain")
 
-    async def _get_completion(self, prompt: str) -> str:
-        """Helper method for GPT-4 completions"""
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a BC curriculum specialist. Format responses in clean HTML only, with no explanations or markdown code blocks. Return only the requested content."},
-                *self.conversation_history[-2:],  # Only keep last 2 messages for context
-                {"role": "user", "content": prompt}
-            ]
-        )
-        return response.choices[0].message.content
+    def _build_messages(self, prompt: str) -> List[Dict]:
+        # Each prompt already carries the earlier stage outputs it needs, so the history isn't resent
+        return [
+            {"role": "system", "content": "You are a BC curriculum specialist. Format responses in clean HTML only, with no explanations or markdown code blocks. Return only the requested content."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _fit_prompt(self, stage: str, render: Callable[[Dict[str, str]], str], sources: List[ContextSource]) -> str:
+        """Render a stage prompt with its context sources cut to the stage's token budget."""
+        budget = STAGE_TOKEN_BUDGETS[stage]
+        overhead = self.token_budget.count_messages(self._build_messages(render({source.name: "" for source in sources})))
+        if overhead >= budget:
+            logger.warning(f"Fixed prompt for {stage} is {overhead} tokens, over its {budget} token budget; all context is dropped")
+        context = self.token_budget.fit(sources, budget - overhead)
+        prompt = render(context)
+
+        tokens = self.token_budget.count_messages(self._build_messages(prompt))
+        cut = [source.name for source in sources if context[source.name] != source.text]
+        logger.info(f"Prompt tokens for {stage}: {tokens}/{budget}" + (f", cut {', '.join(cut)}" if cut else ""))
+        return prompt
+
+    async def _get_completion(self, prompt: str, stage: Optional[str] = None) -> str:
+        """Helper method for GPT-4 completions, served from the stage cache when possible"""
+        messages = self._build_messages(prompt)
+        if stage is None:
+            return await self.llm.complete(model=self.MODEL, messages=messages)
+        return await cached_completion(self.llm, self.cache, self.MODEL, stage, messages, self.use_cache)
+
+    async def _stream_completion(self, prompt: str) -> AsyncIterator[str]:
+        """Helper method for streamed GPT-4 completions"""
+        async for token in self.llm.stream(model=self.MODEL, messages=self._build_messages(prompt)):
+            yield token
 
     async def execute_chain(self, 
                           grade_level: str, 
@@ -31,44 +64,99 @@ class LessonPlanChain:
                           curriculum_context: str, 
                           previous_context: str, 
                           templates: Dict,
-                          video_resources: List[Dict] = None) -> Dict:  # Add video_resources parameter
+                          video_resources: List[Dict] = None,  # Add video_resources parameter
+                          curriculum_analysis: Optional[str] = None) -> Dict:
         """Execute the lesson planning prompt chain with parallel processing"""
+        result = None
+        async for event in self.execute_chain_stream(
+            grade_level=grade_level,
+            subject=subject,
+            curriculum_context=curriculum_context,
+            previous_context=previous_context,
+            templates=templates,
+            video_resources=video_resources,
+            curriculum_analysis=curriculum_analysis
+        ):
+            if event["event"] == "complete":
+                result = event["data"]
+        return result
+
+    async def execute_chain_stream(self,
+                                 grade_level: str,
+                                 subject: str,
+                                 curriculum_context: str,
+                                 previous_context: str,
+                                 templates: Dict,
+                                 video_resources: List[Dict] = None,
+                                 curriculum_analysis: Optional[str] = None) -> AsyncIterator[Dict]:
+        """
+        Execute the chain, yielding a `stage` event as each stage completes,
+        a `token` event for each piece of the final plan HTML, and a
+        `complete` event with the same result execute_chain returns.
+        A precomputed `curriculum_analysis` skips the first stage.
+        """
         logger.info(f"Starting chain: Grade {grade_level} {subject}")
         
         try:
-            curriculum_analysis = await self._analyze_curriculum_requirements(
-                grade_level, subject, curriculum_context
-            )
-            
-            # Parallel execution of steps 2-4
-            objectives, activities, assessment = await asyncio.gather(
-                self._generate_learning_objectives(grade_level, curriculum_analysis),
-                self._create_activities(curriculum_analysis),
-                self._design_assessment(curriculum_analysis),
-                return_exceptions=True
-            )
+            if curriculum_analysis is None:
+                curriculum_analysis = await self._analyze_curriculum_requirements(
+                    grade_level, subject, curriculum_context
+                )
+            else:
+                # Keep the history identical to a computed analysis for the later stages
+                self.conversation_history.append({"role": "assistant", "content": curriculum_analysis})
+            yield {"event": "stage", "data": {"stage": "curriculum_analysis", "content": curriculum_analysis}}
             
-            # Check for exceptions
-            for result in [objectives, activities, assessment]:
-                if isinstance(result, Exception):
-                    logger.error(f"Failed: {str(result)}")
-                    raise result
+            # Parallel execution of steps 2-4, reported in completion order
+            tasks = {
+                asyncio.ensure_future(self._generate_learning_objectives(grade_level, curriculum_analysis)): "objectives",
+                asyncio.ensure_future(self._create_activities(curriculum_analysis)): "activities",
+                asyncio.ensure_future(self._design_assessment(curriculum_analysis)): "assessment"
+            }
+            results = {}
+            pending = set(tasks)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        stage = tasks[task]
+                        if task.exception() is not None:
+                            logger.error(f"Failed: {str(task.exception())}")
+                            raise task.exception()
+                        results[stage] = task.result()
+                        yield {"event": "stage", "data": {"stage": stage, "content": results[stage]}}
+            finally:
+                for task in pending:
+                    task.cancel()
 
-            final_plan = await self._compose_final_plan(
+            response_parts = []
+            async for token in self._compose_final_plan(
                 grade_level=grade_level,
                 subject=subject,
                 curriculum_analysis=curriculum_analysis,
-                objectives=objectives,
-                activities=activities,
-                assessment=assessment,
+                objectives=results["objectives"],
+                activities=results["activities"],
+                assessment=results["assessment"],
                 previous_context=previous_context,
                 templates=templates,
                 video_resources=video_resources or []  # Pass video resources with empty list default
-            )
+            ):
+                response_parts.append(token)
+                yield {"event": "token", "data": {"content": token}}
+
+            response = "".join(response_parts)
+            self.conversation_history.append({"role": "assistant", "content": response})
             
-            return {
-                "content": final_plan,
-                "chain_history": self.conversation_history
+            if self.cache is not None:
+                logger.info(f"Stage cache hit rates: {self.cache.hit_rates()}")
+
+            yield {
+                "event": "complete",
+                "data": {
+                    # Clean the response by removing markdown code block markers
+                    "content": strip_markdown_code_blocks(response),
+                    "chain_history": self.conversation_history
+                }
             }
             
         except Exception as e:
@@ -78,36 +166,46 @@ class LessonPlanChain:
     async def _analyze_curriculum_requirements(self, grade_level: str, 
                                             subject: str, 
                                             curriculum_context: str) -> str:
-        prompt = f"""Grade {grade_level} {subject} curriculum analysis:
-            {curriculum_context}
+        def render(context: Dict[str, str]) -> str:
+            return f"""Grade {grade_level} {subject} curriculum analysis:
+            {context["curriculum_context"]}
 
             List only:
             1. Core competencies
             2. Big ideas
             3. Key concepts
             4. Prerequisites"""
-        
-        response = await self._get_completion(prompt)
+
+        # Retrieved chunks arrive best match first, so a cut drops the weakest matches
+        prompt = self._fit_prompt("curriculum_analysis", render, [
+            ContextSource("curriculum_context", curriculum_context, priority=0)
+        ])
+        response = await self._get_completion(prompt, stage="curriculum_analysis")
         self.conversation_history.append({"role": "assistant", "content": response})
         return response
 
     async def _generate_learning_objectives(self, grade_level: str, curriculum_analysis: str) -> str:
-        prompt = f"""Using analysis:
-            {curriculum_analysis}
+        def render(context: Dict[str, str]) -> str:
+            return f"""Using analysis:
+            {context["curriculum_analysis"]}
 
             Create SMART objectives for grade {grade_level}:
             - Specific outcomes
             - Measurable criteria
             - Curriculum alignment
             - Evidence of learning"""
-        
-        response = await self._get_completion(prompt)
+
+        prompt = self._fit_prompt("objectives", render, [
+            ContextSource("curriculum_analysis", curriculum_analysis, priority=0)
+        ])
+        response = await self._get_completion(prompt, stage="objectives")
         self.conversation_history.append({"role": "assistant", "content": response})
         return response
 
     async def _create_activities(self, curriculum_analysis: str) -> str:
-        prompt = f"""Based on:
-            {curriculum_analysis}
+        def render(context: Dict[str, str]) -> str:
+            return f"""Based on:
+            {context["curriculum_analysis"]}
 
             Design activities with:
             1. Time/materials
@@ -118,14 +216,18 @@ class LessonPlanChain:
             6. Transitions
 
             Make: interactive, age-appropriate, multi-modal"""
-        
-        response = await self._get_completion(prompt)
+
+        prompt = self._fit_prompt("activities", render, [
+            ContextSource("curriculum_analysis", curriculum_analysis, priority=0)
+        ])
+        response = await self._get_completion(prompt, stage="activities")
         self.conversation_history.append({"role": "assistant", "content": response})
         return response
 
     async def _design_assessment(self, curriculum_analysis: str) -> str:
-        prompt = f"""Using:
-            {curriculum_analysis}
+        def render(context: Dict[str, str]) -> str:
+            return f"""Using:
+            {context["curriculum_analysis"]}
 
             Create:
             1. Formative checks
@@ -135,8 +237,11 @@ class LessonPlanChain:
             3. Assessment tools
             - Rubrics
             - Self/peer review"""
-        
-        response = await self._get_completion(prompt)
+
+        prompt = self._fit_prompt("assessment", render, [
+            ContextSource("curriculum_analysis", curriculum_analysis, priority=0)
+        ])
+        response = await self._get_completion(prompt, stage="assessment")
         self.conversation_history.append({"role": "assistant", "content": response})
         return response
 
@@ -149,19 +254,21 @@ class LessonPlanChain:
                                 assessment: str,
                                 previous_context: str,
                                 templates: Dict,
-                                video_resources: List[Dict]) -> str:
+                                video_resources: List[Dict]) -> AsyncIterator[str]:
+        """Stream the final lesson plan HTML as it is generated."""
         video_section = self.video_formatter.format_videos_html(video_resources)
         
         # Extract key points from previous context to reduce tokens
-        prev_context_summary = f"Previous lessons: {previous_context.split('Previous plan:')[0]}"
+        prev_context_summary = previous_context.split('Previous plan:')[0]
 
-        prompt = f"""Grade {grade_level} {subject} lesson plan:
+        def render(context: Dict[str, str]) -> str:
+            return f"""Grade {grade_level} {subject} lesson plan:
 
-            Analysis: {curriculum_analysis}
-            Objectives: {objectives}
-            Activities: {activities}
-            Assessment: {assessment}
-            Context: {prev_context_summary}
+            Analysis: {context["curriculum_analysis"]}
+            Objectives: {context["objectives"]}
+            Activities: {context["activities"]}
+            Assessment: {context["assessment"]}
+            Context: Previous lessons: {context["previous_context"]}
 
             Return ONLY the HTML content for the lesson plan, with NO explanations or comments.
             Use this structure:
@@ -184,9 +291,13 @@ class LessonPlanChain:
             Resources:
             {video_section}"""
 
-        response = await self._get_completion(prompt)
-        self.conversation_history.append({"role": "assistant", "content": response})
-        
-        # Clean the response by removing markdown code block markers
-        cleaned_response = strip_markdown_code_blocks(response)
-        return cleaned_response
\ No newline at end of file
+        # The stage outputs come first; the analysis they were built from and past plans fill what is left
+        prompt = self._fit_prompt("final_plan", render, [
+            ContextSource("objectives", objectives, priority=0),
+            ContextSource("activities", activities, priority=1),
+            ContextSource("assessment", assessment, priority=2),
+            ContextSource("curriculum_analysis", curriculum_analysis, priority=3),
+            ContextSource("previous_context", prev_context_summary, priority=4, max_tokens=PREVIOUS_CONTEXT_MAX_TOKENS),
+        ])
+        async for token in self._stream_completion(prompt):
+            yield token
\ No newline at end of file
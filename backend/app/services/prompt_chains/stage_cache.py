@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from services.llm_client import LLMClient
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+class StageCache:
+    """
+    Content-addressed cache of prompt chain stage outputs.
+
+    Entries are keyed by a hash of the model, stage name and the fully
+    rendered messages, and stored in a SQLite file so every worker process
+    on the host shares them. Entries older than `max_age` are dropped and
+    the least recently used entries are evicted once the cache grows past
+    `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024,
+                 max_age: float = 7 * 24 * 3600, evict_every: int = 100):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._puts = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS stage_cache (
+                    key TEXT PRIMARY KEY,
+                    stage TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_stage_cache_accessed_at ON stage_cache(accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(model: str, stage: str, messages: List[Dict]) -> str:
+        payload = json.dumps([model, stage, messages], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, stage: str, key: str) -> Optional[str]:
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT value FROM stage_cache WHERE key = ? AND created_at >= ?",
+                    (key, now - self.max_age)
+                ).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE stage_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Stage cache read failed: {str(e)}")
+            row = None
+
+        self._record(stage, hit=row is not None)
+        return row[0] if row is not None else None
+
+    def put(self, stage: str, key: str, value: str) -> None:
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO stage_cache (key, stage, value, size, created_at, accessed_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (key, stage, value, len(value.encode("utf-8")), now, now)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Stage cache write failed: {str(e)}")
+            return
+
+        with self._stats_lock:
+            self._puts += 1
+            should_evict = self._puts % self.evict_every == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones beyond max_bytes."""
+        try:
+            with self._connection() as conn:
+                conn.execute("DELETE FROM stage_cache WHERE created_at < ?", (time.time() - self.max_age,))
+                conn.execute(
+                    """
+                    DELETE FROM stage_cache WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS running_size
+                            FROM stage_cache
+                        ) WHERE running_size > ?
+                    )
+                    """,
+                    (self.max_bytes,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Stage cache eviction failed: {str(e)}")
+
+    def _record(self, stage: str, hit: bool) -> None:
+        with self._stats_lock:
+            self._stats[stage]["hits" if hit else "misses"] += 1
+
+    def hit_rates(self) -> Dict[str, float]:
+        """Hit rate per stage for lookups made by this process."""
+        with self._stats_lock:
+            return {
+                stage: counts["hits"] / (counts["hits"] + counts["misses"])
+                for stage, counts in self._stats.items()
+                if counts["hits"] + counts["misses"]
+            }
+
+async def cached_completion(llm: LLMClient, cache: Optional[StageCache], model: str, stage: str,
+                            messages: List[Dict], use_cache: bool = True) -> str:
+    """
+    Complete the messages, served from the stage cache when possible.
+
+    Without a cache every call goes to the model. With `use_cache` off the
+    cached output is never read, but the fresh one is still stored.
+    """
+    if cache is None:
+        return await llm.complete(model=model, messages=messages)
+
+    key = StageCache.make_key(model, stage, messages)
+    if use_cache:
+        cached = await asyncio.to_thread(cache.get, stage, key)
+        if cached is not None:
+            logger.info(f"Stage cache hit: {stage}")
+            return cached
+
+    response = await llm.complete(model=model, messages=messages)
+    await asyncio.to_thread(cache.put, stage, key, response)
+    return response
+
+def create_stage_cache() -> Optional[StageCache]:
+    """Build the stage cache from environment settings, or None if disabled."""
+    if os.getenv("STAGE_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    try:
+        return StageCache(
+            path=os.getenv("STAGE_CACHE_PATH", "cache/stage_cache.sqlite3"),
+            max_bytes=int(os.getenv("STAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+            max_age=float(os.getenv("STAGE_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600))
+        )
+    except Exception as e:
+        logger.warning(f"Could not open stage cache: {str(e)}")
+        return None
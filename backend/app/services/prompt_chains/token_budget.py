@@ -0,0 +1,103 @@
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import tiktoken
+from dotenv import load_dotenv
+from utils.logger import setup_logger
+
+load_dotenv()
+
+logger = setup_logger()
+
+# Prompt token budgets per chain stage, covering the system message and the prompt
+STAGE_TOKEN_BUDGETS = {
+    "curriculum_analysis": int(os.getenv("PROMPT_BUDGET_ANALYSIS_TOKENS", 4000)),
+    "objectives": int(os.getenv("PROMPT_BUDGET_STAGE_TOKENS", 2500)),
+    "activities": int(os.getenv("PROMPT_BUDGET_STAGE_TOKENS", 2500)),
+    "assessment": int(os.getenv("PROMPT_BUDGET_STAGE_TOKENS", 2500)),
+    "final_plan": int(os.getenv("PROMPT_BUDGET_FINAL_TOKENS", 6000)),
+}
+
+# Chat formatting adds a few tokens per message and to prime the reply
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+# A source cut to fewer tokens than this is left out instead
+MIN_SOURCE_TOKENS = 50
+TRUNCATION_MARKER = "..."
+# Rough English average, used when the tiktoken encoding can't be loaded
+CHARS_PER_TOKEN = 4
+
+_encodings: Dict[str, Optional[tiktoken.Encoding]] = {}
+_encodings_lock = threading.Lock()
+
+def get_encoding(model: str) -> Optional[tiktoken.Encoding]:
+    """
+    The model's tiktoken encoding, loaded once per process.
+
+    tiktoken downloads the BPE file on first use; if that fails this returns
+    None for the rest of the process and prompts are measured by length.
+    """
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"Could not load the tiktoken encoding for {model}, estimating tokens from length: {str(e)}")
+                encoding = None
+            _encodings[model] = encoding
+        return _encodings[model]
+
+@dataclass
+class ContextSource:
+    """One piece of prompt context; lower priority numbers are filled first."""
+    name: str
+    text: str
+    priority: int
+    max_tokens: Optional[int] = None
+
+class TokenBudget:
+    """
+    Measures prompts with the model's tiktoken encoding and fits context
+    sources into a token budget.
+
+    Sources are filled in priority order. A source that does not fit is cut
+    at a token boundary from the end, so retrieval results and previous
+    plans, which arrive most relevant first, lose their least relevant
+    part. Once the budget is spent the remaining sources are left empty.
+    Without an encoding, tokens are estimated as CHARS_PER_TOKEN characters.
+    """
+
+    def __init__(self, model: str):
+        self.encoding = get_encoding(model)
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(self.encoding.encode_ordinary(text))
+
+    def count_messages(self, messages: List[Dict]) -> int:
+        return sum(self.count(message["content"]) + TOKENS_PER_MESSAGE for message in messages) + TOKENS_PER_REPLY
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.count(text) <= max_tokens:
+            return text
+        keep = max_tokens - self.count(TRUNCATION_MARKER)
+        if keep < MIN_SOURCE_TOKENS:
+            return ""
+        if self.encoding is None:
+            return text[:keep * CHARS_PER_TOKEN] + TRUNCATION_MARKER
+        return self.encoding.decode(self.encoding.encode_ordinary(text)[:keep]) + TRUNCATION_MARKER
+
+    def fit(self, sources: List[ContextSource], budget: int) -> Dict[str, str]:
+        """Return each source's text, cut so that together they use at most budget tokens."""
+        fitted = {}
+        remaining = max(0, budget)
+        for source in sorted(sources, key=lambda source: source.priority):
+            limit = remaining if source.max_tokens is None else min(remaining, source.max_tokens)
+            fitted[source.name] = self.truncate(source.text, limit)
+            remaining = max(0, remaining - self.count(fitted[source.name]))
+        return fitted
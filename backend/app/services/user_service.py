@@ -1,93 +1,71 @@
-from typing import Optional, Dict
-import psycopg2
-from psycopg2.extras import Json
+from typing import Optional, Dict, Tuple
+from collections import OrderedDict
+from database.connection_pool import ConnectionPool
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
 class UserService:
-    def __init__(self, db_connection):
-        self.conn = db_connection
+    def __init__(self, pool: ConnectionPool, cache_size: int = 4096):
+        self.pool = pool
+        self.cache_size = cache_size
+        # auth0 sub -> (profile fields last written, user id)
+        self._user_ids: "OrderedDict[str, Tuple[Tuple, int]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
 
     def get_or_create_user(self, auth0_user: Dict) -> int:
         """
         Get an existing user or create a new one based on Auth0 user data.
         Returns the user ID.
+
+        Users are resolved from an in-memory map keyed by the Auth0 `sub`, so
+        the database is only touched for a user seen for the first time in
+        this process or when their profile fields change.
         """
-        try:
-            with self.conn.cursor() as cursor:
-                # Try to find existing user
-                cursor.execute(
-                    "SELECT id, email, name, picture FROM users WHERE auth0_id = %s",
-                    (auth0_user['sub'],)
-                )
-                result = cursor.fetchone()
-                
-                if result:
-                    user_id = result[0]
-                    # Check if we need to update user information
-                    email = result[1]
-                    name = result[2]
-                    picture = result[3]
-                    
-                    # If we have new information that was previously missing, update the user
-                    if (auth0_user.get('email') and not email) or \
-                       (auth0_user.get('name') and not name) or \
-                       (auth0_user.get('picture') and not picture):
-                        self.update_user_info(user_id, auth0_user)
-                        
-                    return user_id
-                
-                print(f"Creating new user: {auth0_user}")
-                
-                # Create new user if not found
-                cursor.execute(
-                    """
-                    INSERT INTO users (auth0_id, email, name, picture)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id
-                    """,
-                    (
-                        auth0_user['sub'],
-                        auth0_user.get('email'),
-                        auth0_user.get('name'),
-                        auth0_user.get('picture')
-                    )
-                )
-                self.conn.commit()
-                return cursor.fetchone()[0]
-                
-        except Exception as e:
-            logger.error(f"Error in get_or_create_user: {str(e)}")
-            self.conn.rollback()
-            raise
-            
-    def update_user_info(self, user_id: int, auth0_user: Dict) -> None:
+        auth0_id = auth0_user['sub']
+        profile = (auth0_user.get('email'), auth0_user.get('name'), auth0_user.get('picture'))
+
+        with self._cache_lock:
+            cached = self._user_ids.get(auth0_id)
+            if cached is not None and cached[0] == profile:
+                self._user_ids.move_to_end(auth0_id)
+                return cached[1]
+
+        user_id = self._upsert_user(auth0_id, profile)
+
+        with self._cache_lock:
+            self._user_ids[auth0_id] = (profile, user_id)
+            self._user_ids.move_to_end(auth0_id)
+            while len(self._user_ids) > self.cache_size:
+                self._user_ids.popitem(last=False)
+
+        return user_id
+
+    def _upsert_user(self, auth0_id: str, profile: Tuple[Optional[str], Optional[str], Optional[str]]) -> int:
         """
-        Update user information if new data is available.
+        Insert the user or fill in their profile in a single statement.
+        Missing profile fields never overwrite values already stored.
         """
         try:
-            with self.conn.cursor() as cursor:
+            with self.pool.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(
                     """
-                    UPDATE users 
+                    INSERT INTO users (auth0_id, email, name, picture)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (auth0_id) DO UPDATE
                     SET 
-                        email = COALESCE(%s, email),
-                        name = COALESCE(%s, name),
-                        picture = COALESCE(%s, picture),
+                        email = COALESCE(EXCLUDED.email, users.email),
+                        name = COALESCE(EXCLUDED.name, users.name),
+                        picture = COALESCE(EXCLUDED.picture, users.picture),
                         updated_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
+                    RETURNING id
                     """,
-                    (
-                        auth0_user.get('email'),
-                        auth0_user.get('name'),
-                        auth0_user.get('picture'),
-                        user_id
-                    )
+                    (auth0_id, *profile)
                 )
-                self.conn.commit()
-                logger.info(f"Updated user information for user ID: {user_id}")
+                user_id = cursor.fetchone()[0]
+                logger.info(f"Resolved user ID {user_id} for {auth0_id}")
+                return user_id
         except Exception as e:
-            logger.error(f"Error updating user information: {str(e)}")
-            self.conn.rollback()
-            raise 
\ No newline at end of file
+            logger.error(f"Error in get_or_create_user: {str(e)}")
+            raise
\ No newline at end of file
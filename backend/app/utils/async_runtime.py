@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+class AsyncRuntime:
+    """
+    Long-lived asyncio event loop running on a dedicated thread.
+
+    Flask request threads submit coroutines with `run()` and block on the
+    result, so many requests can await I/O concurrently on one loop and
+    loop-bound objects (aiohttp sessions, AsyncOpenAI clients) can be
+    created once and reused across requests.
+    """
+
+    def __init__(self, name: str = "async-runtime"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the shared loop and wait for its result."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    def iterate(self, agen: AsyncIterator) -> Iterator:
+        """
+        Drive an async generator on the shared loop from a sync caller, e.g.
+        a streaming Flask response. The generator is closed if the caller
+        stops early (client disconnected).
+        """
+        done = object()
+
+        async def next_item():
+            try:
+                return await agen.__anext__()
+            except StopAsyncIteration:
+                return done
+
+        try:
+            while True:
+                item = self.run(next_item())
+                if item is done:
+                    return
+                yield item
+        finally:
+            self.run(agen.aclose())
+
+    def stop(self, timeout: float = 5) -> None:
+        """
+        Cancel work still running on the loop, then stop it and join its
+        thread. Callers blocked in `run()` get a CancelledError instead of
+        waiting forever.
+        """
+        if self.loop.is_closed():
+            return
+
+        async def cancel_pending():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.loop.shutdown_asyncgens()
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_pending(), self.loop).result(timeout)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self.loop.close()
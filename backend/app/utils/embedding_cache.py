@@ -0,0 +1,170 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from lancedb.embeddings import register
+from lancedb.embeddings.openai import OpenAIEmbeddings
+
+# Lookups and inserts are split into batches below SQLite's bound-parameter limit
+SQLITE_BATCH_SIZE = 500
+
+# Used when EMBEDDING_CACHE_PATH is unset; ingestion sets its own with set_default_cache_path
+_default_cache_path = "cache/embedding_cache.sqlite3"
+
+
+class EmbeddingCache:
+    """On-disk LRU cache of embedding vectors.
+
+    Vectors are keyed by a SHA-256 of the model name, dimensions and text, and
+    stored as raw float32 bytes in a SQLite file so they survive across runs
+    and can be shared by concurrent processes. The ingestion pipeline in
+    database/vectordb loads this same module, so tables created there can be
+    opened and queried here.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1_000_000, evict_every: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    accessed_at REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_accessed_at ON embeddings(accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(model: str, dimensions: int, text: str) -> bytes:
+        return hashlib.sha256(f"{model}\0{dimensions}\0{text}".encode("utf-8")).digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        """Look up many keys at once; missing keys are absent from the result."""
+        found = {}
+        now = time.time()
+        unique_keys = list(dict.fromkeys(keys))
+        with self._connection() as conn:
+            for start in range(0, len(unique_keys), SQLITE_BATCH_SIZE):
+                batch = unique_keys[start:start + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+                if rows:
+                    conn.execute(
+                        f"UPDATE embeddings SET accessed_at = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [now, *(row[0] for row in rows)],
+                    )
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(unique_keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[bytes, Sequence[float]]) -> None:
+        now = time.time()
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in items.items()
+        ]
+        with self._connection() as conn:
+            for start in range(0, len(rows), SQLITE_BATCH_SIZE):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                    rows[start:start + SQLITE_BATCH_SIZE],
+                )
+
+        with self._lock:
+            self._writes += len(rows)
+            should_evict = self._writes >= self.evict_every
+            if should_evict:
+                self._writes = 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop the least recently used vectors beyond max_entries."""
+        with self._connection() as conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    """
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY accessed_at ASC LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def set_default_cache_path(path: str) -> None:
+    """Set where the cache lives when EMBEDDING_CACHE_PATH is unset."""
+    global _default_cache_path
+    _default_cache_path = path
+
+
+def get_embedding_cache(path: Optional[str] = None) -> EmbeddingCache:
+    """Return the process-wide cache for a path (EMBEDDING_CACHE_PATH by default)."""
+    path = path or os.getenv("EMBEDDING_CACHE_PATH", _default_cache_path)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = EmbeddingCache(
+                path, max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 1_000_000))
+            )
+        return _caches[path]
+
+
+@register("openai-cached")
+class CachedOpenAIEmbeddings(OpenAIEmbeddings):
+    """OpenAI embedding function that only calls the API for texts it has not seen.
+
+    The cache location is taken from the environment rather than stored as a
+    field, so the config LanceDB saves in the table schema stays portable.
+    """
+
+    def generate_embeddings(self, texts) -> List[Optional[np.ndarray]]:
+        texts = list(texts)
+        cache = get_embedding_cache()
+        keys = [EmbeddingCache.make_key(self.name, self.ndims(), text) for text in texts]
+        found = cache.get_many(keys)
+
+        texts_by_key = dict(zip(keys, texts))
+        missing = [key for key in texts_by_key if key not in found]
+        if missing:
+            vectors = super().generate_embeddings([texts_by_key[key] for key in missing])
+            new_items = {key: vector for key, vector in zip(missing, vectors) if vector is not None}
+            cache.put_many(new_items)
+            found.update({key: np.asarray(vector, dtype=np.float32) for key, vector in new_items.items()})
+
+        return [found.get(key) for key in keys]
@@ -0,0 +1,77 @@
+import logging
+import os
+from typing import Optional
+
+import pandas as pd
+from lancedb.rerankers import RRFReranker
+
+logger = logging.getLogger(__name__)
+
+# Search tuning once the table has a vector index: IVF partitions probed and
+# re-ranking depth on full vectors (0 disables refinement)
+VECTOR_SEARCH_NPROBES = int(os.getenv("LANCEDB_NPROBES", 20))
+VECTOR_SEARCH_REFINE_FACTOR = int(os.getenv("LANCEDB_REFINE_FACTOR", 0)) or None
+
+# "vector" ranks by embedding distance only, "hybrid" fuses full-text and vector rankings
+SEARCH_MODES = ("vector", "hybrid")
+SEARCH_MODE = os.getenv("LANCEDB_SEARCH_MODE", "vector")
+# Reciprocal rank fusion constant; larger values flatten the weight of top ranks
+RRF_K = int(os.getenv("LANCEDB_RRF_K", 60))
+
+
+def is_missing_fts_index(error: Exception) -> bool:
+    """True for the error LanceDB raises when a table has no full-text index to search."""
+    return isinstance(error, ValueError) and "INVERTED index" in str(error)
+
+
+def search_chunks(
+    table,
+    query: str,
+    num_results: int,
+    where: Optional[str] = None,
+    mode: str = SEARCH_MODE,
+    nprobes: int = VECTOR_SEARCH_NPROBES,
+    refine_factor: Optional[int] = VECTOR_SEARCH_REFINE_FACTOR,
+) -> pd.DataFrame:
+    """Search curriculum chunks by vector similarity or hybrid full-text + vector ranking.
+
+    The ingestion tools in database/vectordb load this same module, so the chat
+    app, the retrieval comparison and the backend rank chunks the same way.
+
+    Args:
+        table: LanceDB table object
+        query: Search text; it is embedded for the vector side and tokenized for full-text
+        num_results: Number of results to return
+        where: Optional prefilter applied before ranking
+        mode: One of SEARCH_MODES
+        nprobes: IVF partitions probed when the table has a vector index
+        refine_factor: Re-rank this many times num_results candidates on full vectors
+
+    Returns:
+        pd.DataFrame: Matching chunks, best first
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+
+    if mode == "hybrid":
+        search = table.search(query, query_type="hybrid").rerank(RRFReranker(K=RRF_K))
+    else:
+        search = table.search(query, query_type="vector")
+
+    if where:
+        search = search.where(where, prefilter=True)
+    search = search.nprobes(nprobes)
+    if refine_factor:
+        search = search.refine_factor(refine_factor)
+
+    try:
+        return search.limit(num_results).to_pandas()
+    except ValueError as e:
+        if mode != "hybrid" or not is_missing_fts_index(e):
+            raise
+        # Tables ingested before the full-text index was added can only be searched by vector
+        logger.warning(f"Table has no full-text index, falling back to vector search: {str(e)}")
+        return search_chunks(table, query, num_results, where, "vector", nprobes, refine_factor)
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+from flask import Flask
+
+# The app imports its packages (services, utils, database) relative to backend/app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+# Clients are constructed at import time; tests never reach the real APIs
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from services.llm_client import LLMClient  # noqa: E402
+from utils.async_runtime import AsyncRuntime  # noqa: E402
+
+
+class FakeLLM:
+    """Sleep-based stand-in for the OpenAI calls that tracks how many overlap."""
+
+    def __init__(self, delay: float = 0.2, tokens: int = 3):
+        self.delay = delay
+        self.tokens = tokens
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def complete(self, model, messages, timeout=None, **kwargs):
+        self._enter()
+        try:
+            await asyncio.sleep(self.delay)
+            return f"<p>{model} response</p>"
+        finally:
+            self._exit()
+
+    async def stream(self, model, messages, timeout=None, **kwargs):
+        self._enter()
+        try:
+            for i in range(self.tokens):
+                await asyncio.sleep(self.delay / self.tokens)
+                yield f"<p>part {i}</p>"
+        finally:
+            self._exit()
+
+
+class StubDatabaseManager:
+    """In-memory replacement for DatabaseManager with no curriculum table."""
+
+    curriculum_table = None
+
+    def __init__(self):
+        self.saved = []
+        self._lock = threading.Lock()
+
+    def get_previous_plans(self, grade_level, subject, user_id, limit=5):
+        return []
+
+    def get_curriculum_table_version(self):
+        return None
+
+    def get_curriculum_analysis(self, grade_level, subject, table_version):
+        return None
+
+    def save_plan(self, plan, user_id):
+        with self._lock:
+            self.saved.append((plan, user_id))
+            return len(self.saved)
+
+
+class StubYouTubeAPI:
+    async def search_videos(self, topic, grade_level, max_results=5):
+        return []
+
+    async def close(self):
+        pass
+
+
+class StubResources:
+    """AppResources without Postgres, LanceDB, YouTube or a stage cache."""
+
+    def __init__(self, llm):
+        self.pool = None
+        self.runtime = AsyncRuntime()
+        self.db_manager = StubDatabaseManager()
+        self.youtube_api = StubYouTubeAPI()
+        self.llm = llm
+        self.stage_cache = None
+        self.lesson_templates = []
+
+    @property
+    def curriculum_table(self):
+        return self.db_manager.curriculum_table
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    llm = FakeLLM()
+    monkeypatch.setattr(LLMClient, "complete", lambda self, *args, **kwargs: llm.complete(*args, **kwargs))
+    monkeypatch.setattr(LLMClient, "stream", lambda self, *args, **kwargs: llm.stream(*args, **kwargs))
+    return llm
+
+
+@pytest.fixture
+def resources(fake_llm):
+    resources = StubResources(LLMClient())
+    yield resources
+    resources.runtime.stop()
+
+
+@pytest.fixture
+def app(resources, monkeypatch):
+    """The Flask routes on stub resources, with every bearer token accepted."""
+    from controllers import lesson_plan_controller
+    from services.user_service import UserService
+
+    monkeypatch.setattr(lesson_plan_controller.token_cache, "get", lambda token, profile=None: {"sub": "auth0|test"})
+    monkeypatch.setattr(UserService, "get_or_create_user", lambda self, auth0_user: 1)
+
+    app = Flask(__name__)
+    app.resources = resources
+    lesson_plan_controller.init_routes(app)
+    return app
+
+
+AUTH_HEADERS = {"Authorization": "Bearer test-token"}
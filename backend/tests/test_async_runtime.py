@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import pytest
+
+from conftest import AUTH_HEADERS
+from utils.async_runtime import AsyncRuntime
+
+CONCURRENT_REQUESTS = 8
+
+
+def post_plan(app):
+    response = app.test_client().post("/generate-plan", json={"grade": "3", "subject": "Science"}, headers=AUTH_HEADERS)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_concurrent_plan_requests_overlap_on_the_shared_loop(app, fake_llm, resources):
+    # One request on its own: curriculum analysis, then three parallel stages, then the final plan
+    start = time.perf_counter()
+    post_plan(app)
+    single = time.perf_counter() - start
+    fake_llm.peak = 0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENT_REQUESTS) as executor:
+        plans = list(executor.map(lambda _: post_plan(app), range(CONCURRENT_REQUESTS)))
+    concurrent = time.perf_counter() - start
+
+    assert len(plans) == CONCURRENT_REQUESTS
+    assert all(plan["content"] for plan in plans)
+    assert len(resources.db_manager.saved) == CONCURRENT_REQUESTS + 1
+    # Serialized, the batch would take CONCURRENT_REQUESTS times as long as one request
+    assert concurrent < single * 2
+    assert fake_llm.peak >= CONCURRENT_REQUESTS
+
+
+def test_stop_shuts_down_cleanly():
+    runtime = AsyncRuntime()
+    assert runtime.run(asyncio.sleep(0, result="done")) == "done"
+    thread = runtime._thread
+
+    # A request still waiting on the loop is cancelled instead of hanging
+    errors = []
+
+    def waiter():
+        try:
+            runtime.run(asyncio.sleep(60))
+        except BaseException as e:
+            errors.append(e)
+
+    blocked = threading.Thread(target=waiter)
+    blocked.start()
+    time.sleep(0.1)
+
+    runtime.stop()
+    blocked.join(timeout=2)
+
+    assert not blocked.is_alive()
+    assert len(errors) == 1 and isinstance(errors[0], CancelledError)
+    assert not thread.is_alive()
+    assert runtime.loop.is_closed()
+    runtime.stop()
+    coro = asyncio.sleep(0)
+    with pytest.raises(RuntimeError):
+        runtime.run(coro)
+    coro.close()
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import time
+
+from conftest import AUTH_HEADERS
+from services.llm_client import LLMClient
+
+FINAL_PLAN_DELAY = 0.5
+
+
+def parse_frame(frame: str):
+    fields = dict(line.split(": ", 1) for line in frame.strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+def test_first_event_arrives_before_the_final_plan(app, resources, monkeypatch):
+    async def slow_stream(self, model, messages, **kwargs):
+        # The final plan is the slow part; earlier events must not wait for it
+        await asyncio.sleep(FINAL_PLAN_DELAY)
+        for part in ("<div>", "plan", "</div>"):
+            yield part
+
+    monkeypatch.setattr(LLMClient, "stream", slow_stream)
+
+    start = time.perf_counter()
+    response = app.test_client().post(
+        "/generate-plan/stream", json={"grade": "3", "subject": "Science"}, headers=AUTH_HEADERS
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    frames = []
+    buffer = ""
+    for chunk in response.response:
+        buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+        while "\n\n" in buffer:
+            frame, buffer = buffer.split("\n\n", 1)
+            frames.append((time.perf_counter() - start, *parse_frame(frame)))
+
+    events = [event for _, event, _ in frames]
+    assert events[0] == "stage"
+    assert events[-1] == "plan"
+    assert "error" not in events
+    assert "token" in events
+
+    first_at = frames[0][0]
+    plan_at = frames[-1][0]
+    assert plan_at - first_at >= FINAL_PLAN_DELAY
+
+    plan = frames[-1][2]
+    assert plan["content"] == "<div>plan</div>"
+    assert plan["id"] == 1
+    assert len(resources.db_manager.saved) == 1
+    saved_plan, user_id = resources.db_manager.saved[0]
+    assert user_id == 1 and saved_plan["content"] == "<div>plan</div>"
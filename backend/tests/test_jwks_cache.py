@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.auth.jwks_cache import JWKSCache
+
+
+def make_key(kid):
+    return {"kty": "RSA", "kid": kid, "use": "sig", "n": f"n-{kid}", "e": "AQAB"}
+
+
+class FakeJWKSServer:
+    """Local stand-in for Auth0's jwks.json that counts fetches and can fail on demand."""
+
+    def __init__(self, kids):
+        self.kids = list(kids)
+        self.fail = False
+        self.fetches = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.fetches += 1
+                if server.fail:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                body = json.dumps({"keys": [make_key(kid) for kid in server.kids]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/.well-known/jwks.json"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = FakeJWKSServer(["key-1"])
+    yield server
+    server.close()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_keys_are_served_from_memory_until_ttl(server):
+    cache = JWKSCache(server.url, ttl=60, refresh_margin=0, min_refetch_interval=0)
+    assert cache.get_key("key-1")["n"] == "n-key-1"
+    for _ in range(10):
+        assert cache.get_key("key-1") is not None
+    assert server.fetches == 1
+
+
+def test_expired_keys_are_refreshed_in_background(server):
+    cache = JWKSCache(server.url, ttl=0.2, refresh_margin=0, min_refetch_interval=0)
+    assert cache.get_key("key-1") is not None
+    server.kids = ["key-1", "key-2"]
+    time.sleep(0.25)
+
+    # The expired lookup is answered from memory while the refresh runs
+    assert cache.get_key("key-1") is not None
+    assert wait_for(lambda: server.fetches == 2)
+    assert wait_for(lambda: "key-2" in cache._keys)
+
+
+def test_refresh_starts_within_margin_before_expiry(server):
+    cache = JWKSCache(server.url, ttl=60, refresh_margin=60, min_refetch_interval=0)
+    assert cache.get_key("key-1") is not None
+    cache.get_key("key-1")
+    assert wait_for(lambda: server.fetches >= 2)
+
+
+def test_unknown_kid_refetches_once(server):
+    cache = JWKSCache(server.url, ttl=60, refresh_margin=0, min_refetch_interval=0)
+    assert cache.get_key("key-1") is not None
+    server.kids = ["key-2"]
+
+    assert cache.get_key("key-2")["kid"] == "key-2"
+    assert server.fetches == 2
+
+
+def test_unknown_kid_refetch_is_throttled(server):
+    cache = JWKSCache(server.url, ttl=60, refresh_margin=0, min_refetch_interval=30)
+    assert cache.get_key("key-1") is not None
+
+    for _ in range(5):
+        assert cache.get_key("bogus") is None
+    assert server.fetches == 1
+
+
+def test_failed_refresh_serves_stale_keys(server):
+    cache = JWKSCache(server.url, ttl=0.2, refresh_margin=0, min_refetch_interval=0)
+    assert cache.get_key("key-1") is not None
+    server.fail = True
+    time.sleep(0.25)
+
+    assert cache.get_key("key-1")["kid"] == "key-1"
+    assert wait_for(lambda: server.fetches >= 2)
+    assert cache.get_key("key-1")["kid"] == "key-1"
+
+
+def test_failed_first_fetch_returns_none(server):
+    server.fail = True
+    cache = JWKSCache(server.url, ttl=60, refresh_margin=0, min_refetch_interval=30)
+    assert cache.get_key("key-1") is None
+    # Throttled, so a burst of requests does not hammer Auth0
+    assert cache.get_key("key-1") is None
+    assert server.fetches == 1
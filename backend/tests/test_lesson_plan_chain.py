@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+from services.prompt_chains.lesson_plan_chain import LessonPlanChain
+
+# Latency injected per stage, keyed by a phrase from each stage's prompt
+STAGE_DELAYS = {
+    "SMART objectives": 0.3,
+    "Design activities": 0.5,
+    "Formative checks": 0.4,
+}
+
+
+class SlowLLM:
+    """Fake LLMClient whose calls sleep for their stage's latency."""
+
+    async def complete(self, model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        delay = next((delay for phrase, delay in STAGE_DELAYS.items() if phrase in prompt), 0.05)
+        await asyncio.sleep(delay)
+        return "<p>stage output</p>"
+
+    async def stream(self, model, messages, **kwargs):
+        await asyncio.sleep(0.05)
+        yield "<div>plan</div>"
+
+
+async def time_parallel_stages():
+    chain = LessonPlanChain(SlowLLM())
+    finished = {}
+    start = None
+    async for event in chain.execute_chain_stream(
+        grade_level="3",
+        subject="Science",
+        curriculum_context="Living things have life cycles.",
+        previous_context="No previous lesson plans available for context.",
+        templates={},
+    ):
+        if event["event"] != "stage":
+            continue
+        stage = event["data"]["stage"]
+        if stage == "curriculum_analysis":
+            start = time.perf_counter()
+        else:
+            finished[stage] = time.perf_counter() - start
+    return finished
+
+
+def test_stages_two_to_four_take_as_long_as_the_slowest():
+    finished = asyncio.run(time_parallel_stages())
+
+    assert set(finished) == {"objectives", "activities", "assessment"}
+    slowest = max(STAGE_DELAYS.values())
+    elapsed = max(finished.values())
+    assert slowest <= elapsed < slowest + 0.2
+    # Run one after another they would take the sum of the delays
+    assert elapsed < sum(STAGE_DELAYS.values()) * 0.6
+    # Stages are reported as they complete, fastest first
+    assert sorted(finished, key=finished.get) == ["objectives", "assessment", "activities"]
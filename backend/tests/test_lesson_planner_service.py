@@ -0,0 +1,61 @@
+import pytest
+
+from conftest import AUTH_HEADERS
+from services.lesson_planner_service import LessonPlannerAgent, sql_string
+
+PRECOMPUTED_ANALYSIS = "<p>precomputed analysis</p>"
+
+
+@pytest.fixture
+def precomputed(resources, monkeypatch):
+    """Serve a stored curriculum analysis for every grade and subject."""
+    lookups = []
+
+    def get_curriculum_analysis(grade_level, subject, table_version):
+        lookups.append((grade_level, subject))
+        return PRECOMPUTED_ANALYSIS
+
+    monkeypatch.setattr(resources.db_manager, "get_curriculum_table_version", lambda: 1)
+    monkeypatch.setattr(resources.db_manager, "get_curriculum_analysis", get_curriculum_analysis)
+    return lookups
+
+
+def analysis_of(resources, use_cache):
+    agent = LessonPlannerAgent("3", "Science", resources, use_cache=use_cache)
+
+    async def run():
+        async for event in agent.generate_daily_plan_stream(user_id=1):
+            if event["event"] == "stage" and event["data"]["stage"] == "curriculum_analysis":
+                return event["data"]["content"]
+
+    return resources.runtime.run(run())
+
+
+def test_precomputed_analysis_is_used(resources, precomputed):
+    assert analysis_of(resources, use_cache=True) == PRECOMPUTED_ANALYSIS
+    assert precomputed == [("3", "Science")]
+
+
+def test_bypass_cache_skips_precomputed_analysis(resources, precomputed, fake_llm):
+    analysis = analysis_of(resources, use_cache=False)
+    assert analysis != PRECOMPUTED_ANALYSIS
+    assert precomputed == []
+
+
+@pytest.mark.parametrize("endpoint", ["/generate-plan", "/generate-plan/stream"])
+@pytest.mark.parametrize("payload", [
+    {"grade": "3"},
+    {"subject": "Science"},
+    {"grade": "3' OR '1'='1", "subject": "Science"},
+    {"grade": "3", "subject": "Science' OR subject_area != '"},
+    {"grade": 3, "subject": "Science"},
+])
+def test_invalid_grade_or_subject_is_rejected(app, resources, fake_llm, endpoint, payload):
+    response = app.test_client().post(endpoint, json=payload, headers=AUTH_HEADERS)
+    assert response.status_code == 400
+    assert fake_llm.calls == 0
+    assert resources.db_manager.saved == []
+
+
+def test_sql_string_escapes_quotes():
+    assert sql_string("it's") == "'it''s'"
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from utils.search import search_chunks
+
+MISSING_FTS_INDEX = ValueError(
+    "Invalid input, Cannot perform full text search unless an INVERTED index has been created on at least one column"
+)
+
+
+class FakeSearch:
+    def __init__(self, error=None):
+        self.error = error
+
+    def rerank(self, reranker):
+        return self
+
+    def where(self, where, prefilter=False):
+        return self
+
+    def nprobes(self, nprobes):
+        return self
+
+    def refine_factor(self, refine_factor):
+        return self
+
+    def limit(self, limit):
+        return self
+
+    def to_pandas(self):
+        if self.error:
+            raise self.error
+        return pd.DataFrame({"text": ["chunk"]})
+
+
+class FakeTable:
+    """Table whose hybrid searches fail with `hybrid_error`."""
+
+    def __init__(self, hybrid_error):
+        self.hybrid_error = hybrid_error
+        self.query_types = []
+
+    def search(self, query, query_type):
+        self.query_types.append(query_type)
+        return FakeSearch(self.hybrid_error if query_type == "hybrid" else None)
+
+
+def test_missing_fts_index_falls_back_to_vector():
+    table = FakeTable(MISSING_FTS_INDEX)
+    df = search_chunks(table, "query", 5, mode="hybrid")
+    assert list(df["text"]) == ["chunk"]
+    assert table.query_types == ["hybrid", "vector"]
+
+
+@pytest.mark.parametrize("error", [ValueError("bad where clause"), RuntimeError("connection lost")])
+def test_other_hybrid_errors_are_raised(error):
+    table = FakeTable(error)
+    with pytest.raises(type(error)):
+        search_chunks(table, "query", 5, mode="hybrid")
+    assert table.query_types == ["hybrid"]
@@ -0,0 +1,54 @@
+import asyncio
+
+from services.prompt_chains.stage_cache import StageCache, cached_completion
+
+MESSAGES = [{"role": "user", "content": "Grade 3 Science"}]
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, model, messages, **kwargs):
+        self.calls += 1
+        return f"response {self.calls}"
+
+
+def complete(llm, cache, use_cache=True, stage="search_query"):
+    return asyncio.run(cached_completion(llm, cache, "gpt-4o-mini", stage, MESSAGES, use_cache))
+
+
+def test_second_call_is_served_from_cache(tmp_path):
+    llm = CountingLLM()
+    cache = StageCache(str(tmp_path / "stage_cache.sqlite3"))
+
+    assert complete(llm, cache) == "response 1"
+    assert complete(llm, cache) == "response 1"
+    assert llm.calls == 1
+    assert cache.hit_rates() == {"search_query": 0.5}
+
+
+def test_bypass_skips_the_read_but_stores_the_fresh_output(tmp_path):
+    llm = CountingLLM()
+    cache = StageCache(str(tmp_path / "stage_cache.sqlite3"))
+
+    assert complete(llm, cache) == "response 1"
+    assert complete(llm, cache, use_cache=False) == "response 2"
+    assert complete(llm, cache) == "response 2"
+    assert llm.calls == 2
+
+
+def test_stages_do_not_share_entries(tmp_path):
+    llm = CountingLLM()
+    cache = StageCache(str(tmp_path / "stage_cache.sqlite3"))
+
+    complete(llm, cache, stage="objectives")
+    complete(llm, cache, stage="activities")
+    assert llm.calls == 2
+
+
+def test_without_a_cache_every_call_reaches_the_model():
+    llm = CountingLLM()
+    complete(llm, None)
+    complete(llm, None)
+    assert llm.calls == 2
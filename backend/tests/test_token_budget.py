@@ -0,0 +1,59 @@
+import logging
+
+import pytest
+import tiktoken
+
+from services.prompt_chains import token_budget
+from services.prompt_chains.lesson_plan_chain import LessonPlanChain
+from services.prompt_chains.token_budget import CHARS_PER_TOKEN, ContextSource, TokenBudget
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Make tiktoken's BPE download fail, as it does without network access."""
+    def fail(*args, **kwargs):
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(token_budget, "_encodings", {})
+    monkeypatch.setattr(tiktoken, "encoding_for_model", fail)
+    monkeypatch.setattr(tiktoken, "get_encoding", fail)
+
+
+def test_failed_encoding_download_falls_back_to_length_estimate(offline, caplog):
+    with caplog.at_level(logging.WARNING):
+        budget = TokenBudget("gpt-4o-mini")
+    assert budget.encoding is None
+    assert "estimating tokens from length" in caplog.text
+    assert budget.count("x" * 40) == 40 // CHARS_PER_TOKEN
+
+
+def test_sources_are_filled_in_priority_order(offline):
+    budget = TokenBudget("gpt-4o-mini")
+    fitted = budget.fit([
+        ContextSource("low", "l" * 4000, priority=1),
+        ContextSource("high", "h" * 2000, priority=0),
+    ], budget=800)
+
+    assert fitted["high"] == "h" * 2000
+    assert fitted["low"].startswith("l") and fitted["low"].endswith("...")
+    assert budget.count(fitted["high"]) + budget.count(fitted["low"]) <= 800
+
+
+def test_source_below_minimum_is_dropped(offline):
+    budget = TokenBudget("gpt-4o-mini")
+    fitted = budget.fit([ContextSource("only", "x" * 4000, priority=0)], budget=20)
+    assert fitted["only"] == ""
+
+
+def test_fixed_prompt_over_budget_logs_warning(offline, monkeypatch, caplog):
+    monkeypatch.setitem(token_budget.STAGE_TOKEN_BUDGETS, "objectives", 10)
+    chain = LessonPlanChain(llm=None)
+
+    with caplog.at_level(logging.WARNING):
+        prompt = chain._fit_prompt(
+            "objectives",
+            lambda context: f"Fixed instructions {context['analysis']}",
+            [ContextSource("analysis", "a" * 400, priority=0)],
+        )
+    assert prompt == "Fixed instructions "
+    assert "over its 10 token budget" in caplog.text
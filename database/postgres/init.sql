@@ -29,6 +29,17 @@ CREATE TABLE IF NOT EXISTS lesson_plans (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Curriculum analysis precomputed offline for each grade and subject,
+-- tied to the version of the LanceDB curriculum table it was built from
+CREATE TABLE IF NOT EXISTS curriculum_analysis (
+    grade_level VARCHAR(50) NOT NULL,
+    subject VARCHAR(50) NOT NULL,
+    table_version INTEGER NOT NULL,
+    analysis TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (grade_level, subject, table_version)
+);
+
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_lesson_templates_data ON lesson_templates USING GIN (data);
 CREATE INDEX IF NOT EXISTS idx_lesson_plans_grade_subject ON lesson_plans(grade_level, subject);
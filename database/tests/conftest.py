@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Ingestion modules import their helpers (utils.*) relative to database/vectordb
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vectordb"))
@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+
+from utils.bulk_embedding import BulkEmbedder
+from utils.ingest_journal import IngestJournal
+
+SOURCE_ID = "source"
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = IngestJournal(str(tmp_path / "journal.sqlite3"))
+    journal.start(resume=False)
+    return journal
+
+
+def chunk(chunk_id, section_id="section", text=None):
+    return {"id": chunk_id, "section_id": section_id, "text": text or chunk_id}
+
+
+def embedded(rows):
+    return [{**row, "vector": np.full(2, 0.5, dtype=np.float32)} for row in rows]
+
+
+def chunk_section(journal, section_id, chunk_ids):
+    journal.record_formatted(SOURCE_ID, section_id, "content", {"grade_level": "3"})
+    journal.record_chunked(section_id, chunk_ids)
+
+
+class FlakyEmbeddings:
+    """Rejects "rejected" texts and fails every batch containing "unavailable"."""
+
+    def compute_source_embeddings(self, texts):
+        if "unavailable" in texts:
+            raise TimeoutError("embedding request timed out")
+        return [None if text == "rejected" else [0.5, 0.5] for text in texts]
+
+
+def test_section_is_written_once_every_chunk_is(journal):
+    chunk_section(journal, "section", ["a", "b"])
+    rows = embedded([chunk("a"), chunk("b")])
+    journal.record_embedded(rows)
+
+    journal.record_written(rows[:1])
+    assert journal.incomplete_section_ids() == {"section"}
+
+    journal.record_written(rows[1:])
+    assert journal.incomplete_section_ids() == set()
+
+
+def test_duplicate_chunk_ids_are_expected_once(journal):
+    chunk_section(journal, "section", ["a", "a"])
+    journal.record_written(embedded([chunk("a")]))
+    assert journal.incomplete_section_ids() == set()
+
+
+def test_dropped_chunks_settle_their_section(journal):
+    chunk_section(journal, "section", ["a", "b"])
+    journal.record_written(embedded([chunk("a")]))
+    journal.record_dropped_chunks([chunk("b")])
+    assert journal.incomplete_section_ids() == set()
+
+
+def test_section_without_chunks_is_written(journal):
+    chunk_section(journal, "section", [])
+    assert journal.incomplete_section_ids() == set()
+
+
+def test_dropped_section_is_forgotten(journal):
+    journal.record_formatted(SOURCE_ID, "section", "content", {})
+    journal.record_dropped_section("section")
+    assert journal.formatted_section("section") is None
+    assert journal.finish() == 0
+
+
+def test_finish_prunes_checkpoints_of_a_complete_run(journal):
+    chunk_section(journal, "section", ["a"])
+    rows = embedded([chunk("a")])
+    journal.record_embedded(rows)
+    journal.record_written(rows)
+
+    assert journal.finish() == 0
+    assert journal.formatted_section("section") is None
+    assert journal.embedded_vectors(["a"]) == {}
+
+
+def test_resume_replays_incomplete_sections_from_checkpoints(tmp_path, journal):
+    chunk_section(journal, "done", ["a"])
+    chunk_section(journal, "partial", ["b", "c"])
+    rows = embedded([chunk("a", "done"), chunk("b", "partial"), chunk("c", "partial")])
+    journal.record_embedded(rows)
+    journal.record_written(rows[:2])
+
+    assert journal.finish() == 1
+    run_id = journal.run_id
+
+    resumed = IngestJournal(journal.path)
+    assert resumed.start(resume=True) == {"partial"}
+    assert resumed.run_id == run_id
+    assert resumed.formatted_section("partial") == ("content", {"grade_level": "3"})
+    assert set(resumed.embedded_vectors(["b", "c"])) == {"b", "c"}
+
+
+def test_new_run_discards_unfinished_checkpoints(journal):
+    chunk_section(journal, "partial", ["a", "b"])
+    journal.record_embedded(embedded([chunk("a", "partial")]))
+    assert journal.finish() == 1
+
+    fresh = IngestJournal(journal.path)
+    assert fresh.start(resume=False) == {"partial"}
+    assert fresh.run_id != journal.run_id
+    assert fresh.formatted_section("partial") is None
+    assert fresh.embedded_vectors(["a"]) == {}
+
+
+def test_batch_that_runs_out_of_retries_stays_incomplete(journal):
+    # Mirrors IngestPipeline._embed and _write: one batch succeeds, one has a rejected
+    # input and one times out on every attempt
+    chunks = [
+        chunk("a", "ok", "a"),
+        chunk("b", "rejected", "b"),
+        chunk("c", "rejected", "rejected"),
+        chunk("d", "transient", "d"),
+        chunk("e", "transient", "unavailable"),
+    ]
+    for section_id in ("ok", "rejected", "transient"):
+        chunk_section(journal, section_id, [row["id"] for row in chunks if row["section_id"] == section_id])
+
+    embedder = BulkEmbedder(FlakyEmbeddings(), lambda texts: [1] * len(texts), max_batch_size=1, max_retries=0)
+    rows, rejected = embedder.embed_rows(chunks)
+    journal.record_embedded(rows)
+    journal.record_dropped_chunks(rejected)
+    journal.record_written(rows)
+
+    assert [row["id"] for row in rejected] == ["c"]
+    assert embedder.stats.dropped == 1
+    assert embedder.stats.failed == 1
+    assert journal.incomplete_section_ids() == {"transient"}
+    assert journal.finish() == 1
+
+    resumed = IngestJournal(journal.path)
+    assert resumed.start(resume=True) == {"transient"}
+    assert set(resumed.embedded_vectors(["d", "e"])) == {"d"}
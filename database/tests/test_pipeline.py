@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from utils.pipeline import Pipeline, Stage
+
+
+def test_items_flow_through_every_stage():
+    results = []
+    lock = threading.Lock()
+
+    def collect(item):
+        with lock:
+            results.append(item)
+
+    pipeline = Pipeline([
+        Stage("double", lambda item: [item, item], workers=3),
+        Stage("square", lambda item: [item * item], workers=2),
+        Stage("collect", collect),
+    ])
+    pipeline.run(range(10))
+
+    assert sorted(results) == sorted([i * i for i in range(10)] * 2)
+    double, square, collected = (stage.stats for stage in pipeline.stages)
+    assert (double.items_in, double.items_out) == (10, 20)
+    assert (square.items_in, square.items_out) == (20, 20)
+    assert collected.items_in == 20
+
+
+def test_size_only_batches_flush_when_full_or_at_the_end():
+    batches = []
+
+    def slow_items():
+        for i in range(7):
+            # Slower than any time-based flush would wait
+            time.sleep(0.02)
+            yield i
+
+    pipeline = Pipeline([Stage("write", batches.append, batch_size=3, max_wait=None)])
+    pipeline.run(slow_items())
+
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_partial_batch_is_handed_over_after_max_wait():
+    batches = []
+
+    def items():
+        yield 0
+        yield 1
+        time.sleep(0.3)
+        yield 2
+
+    pipeline = Pipeline([Stage("write", batches.append, batch_size=10, max_wait=0.05)])
+    pipeline.run(items())
+
+    assert batches == [[0, 1], [2]]
+
+
+def test_failed_items_are_counted_and_the_rest_continue():
+    results = []
+
+    def fail_on_three(item):
+        if item == 3:
+            raise ValueError("bad item")
+        return [item]
+
+    pipeline = Pipeline([Stage("check", fail_on_three, workers=2), Stage("collect", results.append)])
+    pipeline.run(range(6))
+
+    assert sorted(results) == [0, 1, 2, 4, 5]
+    assert pipeline.stages[0].stats.errors == 1
+    assert pipeline.stages[0].stats.items_in == 6
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_run_returns_once_every_worker_has_drained(workers):
+    pipeline = Pipeline([
+        Stage("first", lambda item: [item], workers=workers, queue_size=1),
+        Stage("second", lambda item: None, workers=workers, queue_size=1),
+    ])
+    thread = threading.Thread(target=pipeline.run, args=(range(20),), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert pipeline.stages[1].stats.items_in == 20
+
+
+def test_slow_stage_blocks_the_one_before_it():
+    fed = []
+
+    def items():
+        for i in range(20):
+            fed.append(i)
+            yield i
+
+    processed = []
+
+    def slow(item):
+        processed.append(item)
+        time.sleep(0.05)
+
+    pipeline = Pipeline([Stage("slow", slow, queue_size=2)])
+    thread = threading.Thread(target=pipeline.run, args=(items(),), daemon=True)
+    thread.start()
+    time.sleep(0.2)
+    # The feeder can only get a bounded queue ahead of the slow stage
+    assert len(fed) - len(processed) <= 2 + 1
+    thread.join(timeout=5)
+    assert processed == list(range(20))
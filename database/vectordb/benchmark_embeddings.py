@@ -0,0 +1,70 @@
+import argparse
+import tempfile
+import time
+from itertools import cycle, islice
+
+import lancedb
+import pyarrow as pa
+
+from embedding import LANCEDB_PATH, TABLE_NAME
+from utils.embedding_backends import EMBEDDING_BACKENDS, create_embedding_function
+
+QUERIES = [
+    "Kindergarten mathematics big ideas",
+    "Grade 3 science curricular competencies",
+    "Grade 5 social studies learning standards content",
+    "Grade 7 english language arts elaborations",
+    "Grade 2 arts education dance and drama",
+    "Grade 6 physical health education healthy living",
+]
+
+def benchmark_backend(backend: str, texts: list, num_queries: int, batch_size: int, k: int) -> None:
+    # Bypass the embedding cache so the OpenAI numbers reflect real API calls
+    func = create_embedding_function(backend, cached=False)
+
+    start = time.perf_counter()
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(func.compute_source_embeddings(texts[i:i + batch_size]))
+    ingest_seconds = time.perf_counter() - start
+
+    # Search a scratch table holding this backend's vectors so dimensions always match
+    with tempfile.TemporaryDirectory() as tmp:
+        table = lancedb.connect(tmp).create_table(
+            "chunks",
+            data=pa.table({
+                "text": texts,
+                "vector": pa.array([list(v) for v in vectors], type=pa.list_(pa.float32(), func.ndims())),
+            }),
+        )
+        queries = list(islice(cycle(QUERIES), num_queries))
+        start = time.perf_counter()
+        for query in queries:
+            query_vector = func.compute_query_embeddings(query)[0]
+            table.search(query_vector).limit(k).to_arrow()
+        search_seconds = time.perf_counter() - start
+
+    print(
+        f"{backend:<8} {func.name:<28} {func.ndims():>5} "
+        f"{len(texts) / ingest_seconds:>12.1f} {len(queries) / search_seconds:>8.1f}"
+    )
+
+def main():
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Measure embedding throughput for ingest and search per backend")
+    parser.add_argument("--backends", default=",".join(EMBEDDING_BACKENDS), help="Comma-separated backends to compare")
+    parser.add_argument("--chunks", type=int, default=500, help="Number of stored chunk texts to embed")
+    parser.add_argument("--queries", type=int, default=50, help="Number of search queries to run")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per embedding call during ingest")
+    parser.add_argument("--k", type=int, default=5, help="Number of results per query")
+    args = parser.parse_args()
+
+    source = lancedb.connect(LANCEDB_PATH).open_table(TABLE_NAME)
+    texts = source.search().select(["text"]).limit(args.chunks).to_arrow().column("text").to_pylist()
+    print(f"Embedding {len(texts)} chunks and running {args.queries} queries per backend\n")
+    print(f"{'backend':<8} {'model':<28} {'dims':>5} {'chunks/sec':>12} {'qps':>8}")
+    for backend in args.backends.split(","):
+        benchmark_backend(backend.strip(), texts, args.queries, args.batch_size, args.k)
+
+if __name__ == "__main__":
+    main()
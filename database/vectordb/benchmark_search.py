@@ -0,0 +1,72 @@
+import argparse
+import statistics
+import time
+from typing import List, Set
+
+import lancedb
+import numpy as np
+
+from embedding import LANCEDB_PATH, TABLE_NAME, get_vector_index, update_vector_index
+from utils.search import VECTOR_SEARCH_NPROBES, VECTOR_SEARCH_REFINE_FACTOR
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of latencies."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def search_texts(table, vector: np.ndarray, k: int, nprobes: int, refine_factor: int | None, exact: bool) -> Set[str]:
+    """Run one vector search and return the texts of the hits."""
+    search = table.search(vector).limit(k)
+    if exact:
+        search = search.bypass_vector_index()
+    else:
+        search = search.nprobes(nprobes)
+        if refine_factor:
+            search = search.refine_factor(refine_factor)
+    return set(search.to_arrow().column("text").to_pylist())
+
+def benchmark(table, num_queries: int, k: int, nprobes: int, refine_factor: int | None) -> None:
+    # Stored chunk vectors double as queries, so the benchmark makes no embedding calls
+    vectors = table.to_arrow().column("vector").to_pylist()
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)
+    queries = [np.asarray(vectors[i], dtype=np.float32) for i in picks]
+
+    recalls = []
+    latencies = {"exact": [], "indexed": []}
+    for vector in queries:
+        start = time.perf_counter()
+        exact = search_texts(table, vector, k, nprobes, refine_factor, exact=True)
+        latencies["exact"].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        approximate = search_texts(table, vector, k, nprobes, refine_factor, exact=False)
+        latencies["indexed"].append((time.perf_counter() - start) * 1000)
+
+        recalls.append(len(exact & approximate) / len(exact) if exact else 1.0)
+
+    print(f"Rows: {table.count_rows()}, queries: {len(queries)}, nprobes: {nprobes}, refine_factor: {refine_factor}")
+    print(f"Recall@{k}: {statistics.mean(recalls):.3f}")
+    for mode, values in latencies.items():
+        print(f"{mode:<8} p50 {percentile(values, 50):.1f} ms, p99 {percentile(values, 99):.1f} ms")
+
+def main():
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark vector index recall and latency against an exact scan")
+    parser.add_argument("--queries", type=int, default=100, help="Number of sampled query vectors")
+    parser.add_argument("--k", type=int, default=10, help="Number of results per query")
+    parser.add_argument("--nprobes", type=int, default=VECTOR_SEARCH_NPROBES, help="IVF partitions probed per query")
+    parser.add_argument("--refine-factor", type=int, default=VECTOR_SEARCH_REFINE_FACTOR, help="Re-rank this many times k candidates on full vectors")
+    parser.add_argument("--build-index", action="store_true", help="Build or refresh the vector index before benchmarking")
+    args = parser.parse_args()
+
+    table = lancedb.connect(LANCEDB_PATH).open_table(TABLE_NAME)
+    if args.build_index:
+        update_vector_index(table)
+    if get_vector_index(table) is None:
+        print("Table has no vector index yet; both modes run a flat scan")
+
+    benchmark(table, args.queries, args.k, args.nprobes, args.refine_factor)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from docling.chunking import HybridChunker
+from docling.document_converter import DocumentConverter
+
+from embedding import CHUNK_MAX_TOKENS
+from utils.tokenizer import OpenAITokenizerWrapper
+
+EXAMPLE_PDF = Path(__file__).parent / "examples" / "ex-pdf-full.pdf"
+
+class BaselineTokenizer(OpenAITokenizerWrapper):
+    """The wrapper before memoization: every call re-encodes the text."""
+
+    def tokenize(self, text: str, **kwargs) -> List[str]:
+        return [str(t) for t in self.tokenizer.encode(text)]
+
+    def get_vocab(self) -> Dict[str, int]:
+        return dict(enumerate(range(self.vocab_size)))
+
+def chunk_texts(document, tokenizer: OpenAITokenizerWrapper, passes: int) -> tuple:
+    """Chunk the document repeatedly; returns the chunk texts and seconds per pass."""
+    chunker = HybridChunker(tokenizer=tokenizer, max_tokens=CHUNK_MAX_TOKENS, merge_peers=True)
+    start = time.perf_counter()
+    for _ in range(passes):
+        texts = [chunk.text for chunk in chunker.chunk(dl_doc=document)]
+    return texts, (time.perf_counter() - start) / passes
+
+def main():
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Compare HybridChunker speed with the baseline and memoized tokenizers")
+    parser.add_argument("--pdf", default=str(EXAMPLE_PDF), help="PDF to convert and chunk")
+    parser.add_argument("--passes", type=int, default=3, help="Chunking passes per tokenizer")
+    args = parser.parse_args()
+
+    document = DocumentConverter().convert(args.pdf).document
+    print(f"Chunking {args.pdf} {args.passes} times per tokenizer (max_tokens={CHUNK_MAX_TOKENS})\n")
+
+    baseline_texts, baseline_seconds = chunk_texts(document, BaselineTokenizer(), args.passes)
+    fast = OpenAITokenizerWrapper()
+    fast_texts, fast_seconds = chunk_texts(document, fast, args.passes)
+
+    print(f"{'tokenizer':<10} {'sec/pass':>9} {'chunks':>7}")
+    print(f"{'baseline':<10} {baseline_seconds:>9.2f} {len(baseline_texts):>7}")
+    print(f"{'memoized':<10} {fast_seconds:>9.2f} {len(fast_texts):>7}")
+    speedup = baseline_seconds / fast_seconds if fast_seconds else 0.0
+    print(f"\nSpeedup {speedup:.1f}x; identical chunks: {baseline_texts == fast_texts}")
+    print(f"Cache: {fast.hits} hits, {fast.misses} misses, {len(fast._cache)} texts held")
+
+if __name__ == "__main__":
+    main()
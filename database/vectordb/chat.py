@@ -4,6 +4,8 @@ import os
 from openai import OpenAI
 from dotenv import load_dotenv
 import re 
+from utils.embedding_cache import CachedOpenAIEmbeddings  # noqa: F401 registers "openai-cached"
+from utils.search import SEARCH_MODE, SEARCH_MODES, search_chunks
 
 # Load environment variables
 load_dotenv()
@@ -15,6 +17,17 @@ client = OpenAI()
 LANCEDB_PATH = "vectordb/data/lancedb"
 TABLE_NAME = "bc_curriculum_website"
 
+# Values as stored by ingestion in the grade_level and subject_area columns
+GRADE_LEVELS = ["Kindergarten"] + [str(grade) for grade in range(1, 13)]
+SUBJECT_AREAS = [
+    "arts-education",
+    "english-language-arts",
+    "mathematics",
+    "physical-health-education",
+    "science",
+    "social-studies",
+]
+
 # Initialize LanceDB connection
 @st.cache_resource
 def init_db():
@@ -34,13 +47,33 @@ def init_db():
         return None
 
 
-def get_context(query: str, table, num_results: int = 3) -> str:
+def build_filter(grade_level: str | None, subject_area: str | None) -> str | None:
+    """Build a SQL prefilter on the metadata columns.
+
+    Args:
+        grade_level: Grade level to restrict to, or None for any
+        subject_area: Subject area to restrict to, or None for any
+
+    Returns:
+        str | None: Filter expression, or None if nothing is selected
+    """
+    conditions = []
+    if grade_level:
+        conditions.append(f"grade_level = '{grade_level}'")
+    if subject_area:
+        conditions.append(f"subject_area = '{subject_area}'")
+    return " AND ".join(conditions) or None
+
+
+def get_context(query: str, table, num_results: int = 3, where: str | None = None, mode: str = SEARCH_MODE) -> str:
     """Search the database for relevant context.
 
     Args:
         query: User's question
         table: LanceDB table object
         num_results: Number of results to return
+        where: Optional prefilter applied before the search
+        mode: "vector" or "hybrid" (full-text + vector with reciprocal rank fusion)
 
     Returns:
         str: Concatenated context from relevant chunks with source information
@@ -49,14 +82,13 @@ def get_context(query: str, table, num_results: int = 3) -> str:
         return "Database is not available. Please check your configuration."
         
     try:
-        results = table.search(query).limit(num_results).to_pandas()
+        results = search_chunks(table, query, num_results, where=where, mode=mode)
         contexts = []
 
         for _, row in results.iterrows():
             # Extract metadata
-            metadata = row.get("metadata", {})
-            grade_level = metadata.get("grade_level", "Unknown Grade")
-            subject_area = metadata.get("subject_area", "Unknown Subject")
+            grade_level = row.get("grade_level") or "Unknown Grade"
+            subject_area = row.get("subject_area") or "Unknown Subject"
             
             # Format the content block
             content_block = {
@@ -120,6 +152,12 @@ if "messages" not in st.session_state:
 # Initialize database connection
 table = init_db()
 
+# Restrict searches to one grade and subject
+with st.sidebar:
+    selected_grade = st.selectbox("Grade level", [None] + GRADE_LEVELS, format_func=lambda value: value or "Any")
+    selected_subject = st.selectbox("Subject area", [None] + SUBJECT_AREAS, format_func=lambda value: value or "Any")
+    selected_mode = st.selectbox("Search mode", SEARCH_MODES, index=SEARCH_MODES.index(SEARCH_MODE))
+
 # Display chat messages
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
@@ -137,7 +175,7 @@ if prompt := st.chat_input("Ask a question"):
 
     # Get relevant context
     with st.status("Searching document...", expanded=False) as status:
-        context = get_context(prompt, table)
+        context = get_context(prompt, table, where=build_filter(selected_grade, selected_subject), mode=selected_mode)
         st.markdown(
             """
             <style>
@@ -0,0 +1,70 @@
+import argparse
+import statistics
+import time
+
+import lancedb
+
+from embedding import LANCEDB_PATH, TABLE_NAME
+from utils.search import SEARCH_MODES, search_chunks
+
+# Keyword-heavy questions teachers ask; a hit is relevant if it belongs to the
+# filtered grade and subject and contains the key term
+KEY_TERMS = [
+    "Big Ideas",
+    "Curricular Competencies",
+    "Learning Standards",
+    "Content",
+    "Elaborations",
+]
+
+def relevant_texts(df, term: str) -> set:
+    """Texts in a result frame that contain the key term."""
+    return {text for text in df["text"] if term.lower() in text.lower()}
+
+def compare(table, k: int) -> None:
+    rows = table.search().select(["grade_level", "subject_area", "text"]).limit(table.count_rows()).to_pandas()
+    combinations = rows[["grade_level", "subject_area"]].dropna().drop_duplicates().itertuples(index=False)
+
+    precision = {mode: [] for mode in SEARCH_MODES}
+    recall = {mode: [] for mode in SEARCH_MODES}
+    latencies = {mode: [] for mode in SEARCH_MODES}
+    for grade_level, subject_area in combinations:
+        where = f"grade_level = '{grade_level}' AND subject_area = '{subject_area}'"
+        candidates = rows[(rows["grade_level"] == grade_level) & (rows["subject_area"] == subject_area)]
+        for term in KEY_TERMS:
+            relevant = relevant_texts(candidates, term)
+            if not relevant:
+                continue
+            query = f"Grade {grade_level} {subject_area.replace('-', ' ')} {term}"
+            for mode in SEARCH_MODES:
+                start = time.perf_counter()
+                df = search_chunks(table, query, k, where=where, mode=mode)
+                latencies[mode].append((time.perf_counter() - start) * 1000)
+
+                hits = relevant_texts(df, term)
+                precision[mode].append(len(hits) / k)
+                recall[mode].append(len(hits) / min(k, len(relevant)))
+
+    print(f"{'mode':<8} {'precision@' + str(k):>13} {'recall@' + str(k):>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode in SEARCH_MODES:
+        if not latencies[mode]:
+            print("No queries with relevant chunks found")
+            return
+        ordered = sorted(latencies[mode])
+        p99 = ordered[min(len(ordered) - 1, int(round(0.99 * (len(ordered) - 1))))]
+        print(
+            f"{mode:<8} {statistics.mean(precision[mode]):>13.3f} {statistics.mean(recall[mode]):>10.3f} "
+            f"{statistics.median(ordered):>8.1f} {p99:>8.1f}"
+        )
+
+def main():
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Compare vector-only and hybrid retrieval on keyword-heavy curriculum queries")
+    parser.add_argument("--k", type=int, default=5, help="Number of results per query")
+    args = parser.parse_args()
+
+    table = lancedb.connect(LANCEDB_PATH).open_table(TABLE_NAME)
+    compare(table, args.k)
+
+if __name__ == "__main__":
+    main()
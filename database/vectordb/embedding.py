@@ -1,54 +1,253 @@
 import argparse
+import hashlib
 import os
+import urllib.parse
+import urllib.request
 from pathlib import Path
 import re
 import sys
+import threading
+import time
 import traceback
-from typing import Dict, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+from dataclasses import dataclass, field
+from io import BytesIO
 
 import lancedb
+import pyarrow as pa
 from dotenv import load_dotenv
-from lancedb.embeddings import get_registry
+from lancedb.embeddings.openai import OpenAIEmbeddings
 from lancedb.pydantic import LanceModel, Vector
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
+from transformers import AutoTokenizer
 from docling.chunking import HybridChunker
+from docling.datamodel.base_models import DocumentStream, InputFormat
 from docling.document_converter import DocumentConverter
+from utils.bulk_embedding import EMBEDDING_CONCURRENCY, LANCEDB_WRITE_BATCH_ROWS, TABLE_WRITE_LOCK, BulkEmbedder
+from utils.embedding_backends import EMBEDDING_BACKEND, LOCAL_EMBEDDING_MODEL, create_embedding_function
+from utils.embedding_cache import CachedOpenAIEmbeddings
+from utils.ingest_journal import IngestJournal
+from utils.pipeline import Pipeline, Stage
+from utils.rate_limit import RETRYABLE_ERRORS, AdaptiveConcurrencyLimiter, get_rate_limiter, retry_delay
 from utils.tokenizer import OpenAITokenizerWrapper
 
 # Configuration Constants
 MAX_TOKENS = 8191
-CURRENT_DIR = Path(__file__).parent
 LANCEDB_PATH = "vectordb/data/lancedb"
 TABLE_NAME = "bc_curriculum_website"
+# Docling markdown keyed by a hash of the source bytes, so unchanged PDFs are not converted again
+CONVERSION_CACHE_DIR = Path(os.getenv("CONVERSION_CACHE_DIR", "vectordb/data/conversions"))
+# Checkpoints of formatted sections and embedded chunks, used by --resume
+INGEST_JOURNAL_PATH = os.getenv("INGEST_JOURNAL_PATH", "vectordb/data/ingest_journal.sqlite3")
+
+# Below this many rows a flat scan is fast and exact, so no vector index is built
+VECTOR_INDEX_MIN_ROWS = int(os.getenv("VECTOR_INDEX_MIN_ROWS", 5000))
+# Retrain the vector index once rows added since it was built exceed this share of indexed rows
+VECTOR_INDEX_REBUILD_FRACTION = float(os.getenv("VECTOR_INDEX_REBUILD_FRACTION", 0.25))
 
 # Initialize global services
 load_dotenv()
-client = OpenAI()
+# Retries happen in process_markdown_batch so the concurrency limiter sees every 429
+client = OpenAI(max_retries=0)
 tokenizer = OpenAITokenizerWrapper()
-embedding_func = get_registry().get("openai").create(name="text-embedding-3-small")
+# OpenAI vectors are cached on disk, so re-ingesting unchanged chunks makes no API calls
+embedding_func = create_embedding_function(EMBEDDING_BACKEND)
+# Local models truncate inputs at 512 of their own WordPiece tokens, far sooner than
+# the OpenAI limit. Chunks are counted with the model's tokenizer and leave room for
+# the "{grade} {subject} {section}:" prefix and the [CLS]/[SEP] tokens
+LOCAL_MODEL_MAX_TOKENS = 512
+CHUNK_PREFIX_RESERVE_TOKENS = 64
+CHUNK_MAX_TOKENS = (
+    MAX_TOKENS // 4 if EMBEDDING_BACKEND == "openai" else LOCAL_MODEL_MAX_TOKENS - CHUNK_PREFIX_RESERVE_TOKENS
+)
+# Budget shared by every document processed in this process
+llm_rate_limiter = get_rate_limiter("llm")
+embedding_rate_limiter = get_rate_limiter("embedding") if EMBEDDING_BACKEND == "openai" else None
+# Docling converters are shared between documents but are not documented as thread-safe
+CONVERSION_LOCK = threading.Lock()
+FORMATTING_MAX_TOKENS = 4000
+
+# Worker threads per ingest stage: formatting and embedding wait on the API,
+# chunking on CPU, and conversion on docling (one document at a time)
+INGEST_CONVERT_WORKERS = int(os.getenv("INGEST_CONVERT_WORKERS", 2))
+# Formatting starts at INGEST_FORMAT_WORKERS calls in flight and adapts up to LLM_MAX_CONCURRENCY
+INGEST_FORMAT_WORKERS = int(os.getenv("INGEST_FORMAT_WORKERS", 3))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+llm_concurrency = AdaptiveConcurrencyLimiter(initial=INGEST_FORMAT_WORKERS, maximum=LLM_MAX_CONCURRENCY)
+INGEST_CHUNK_WORKERS = int(os.getenv("INGEST_CHUNK_WORKERS", 2))
+INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", EMBEDDING_CONCURRENCY))
+# Items a stage may hold queued before the stage feeding it blocks
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 64))
+# Chunks gathered into one embedding call
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", 256))
 
 # Data Models
 @dataclass
 class Section:
     content: str
     metadata: Dict[str, str]
+    section_id: str
 
-class ChunkMetadata(LanceModel):
+class Chunks(LanceModel):
     """
-    You must order the fields in alphabetical order.
-    This is a requirement of the Pydantic implementation.
+    Schema for document chunks with embeddings.
+
+    Metadata lives in top-level columns so searches can prefilter on them
+    through scalar indexes. Ids are content hashes: a source is identified by
+    its URL, a section by its source and raw markdown, and a chunk by its
+    section and text, so re-ingesting the same content upserts the same rows.
     """
+    id: str
+    source_id: str | None
+    section_id: str | None
+    text: str = embedding_func.SourceField()
+    vector: Vector(embedding_func.ndims()) = embedding_func.VectorField()  # type: ignore
     grade_level: str | None
     section_type: str | None
     subject_area: str | None
 
-class Chunks(LanceModel):
-    """Schema for document chunks with embeddings."""
-    text: str = embedding_func.SourceField()
-    vector: Vector(embedding_func.ndims()) = embedding_func.VectorField()  # type: ignore
-    metadata: ChunkMetadata
+METADATA_COLUMNS = ["grade_level", "section_type", "subject_area"]
+
+# Low-cardinality columns get bitmap indexes, section headings and ids a btree
+SCALAR_INDEXES = {
+    "grade_level": "BITMAP",
+    "subject_area": "BITMAP",
+    "section_type": "BTREE",
+    "id": "BTREE",
+    "source_id": "BITMAP",
+    "section_id": "BTREE",
+}
+
+def stable_id(*parts: str) -> str:
+    """Deterministic id for a source, section or chunk from its identifying parts."""
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+
+def sql_list(values) -> str:
+    """Format string values as a SQL IN list."""
+    return ", ".join("'" + value.replace("'", "''") + "'" for value in values)
+
+def open_chunks_table(db):
+    """Open the chunks table, creating it or migrating older schemas as needed."""
+    if TABLE_NAME not in db.table_names():
+        table = db.create_table(TABLE_NAME, schema=Chunks)
+        print("Created new table")
+        return table
+
+    table = db.open_table(TABLE_NAME)
+    check_embedding_backend(table)
+    schema = Chunks.to_arrow_schema()
+    has_columns = set(schema.names) <= set(table.schema.names)
+    uncached = uses_uncached_embedding_function(table)
+    if has_columns and not uncached:
+        print("Using existing table")
+        return table
+
+    if has_columns:
+        # Same model and vectors; only the function LanceDB records in the schema
+        # changes, so query embeddings go through the cache
+        print("Switching existing table to the cached OpenAI embedding function")
+        flat = table.to_arrow().select(schema.names).cast(schema)
+    else:
+        flat = flatten_chunks(table.to_arrow())
+    table = db.create_table(TABLE_NAME, data=flat, schema=Chunks, mode="overwrite")
+    # Overwriting drops every index, so rebuild them now rather than after the next change
+    update_indexes(table)
+    return table
+
+def uses_uncached_embedding_function(table) -> bool:
+    """True for tables built before the embedding cache, which record the plain "openai" function."""
+    config = table.embedding_functions.get("vector")
+    return config is not None and type(config.function) is OpenAIEmbeddings and isinstance(embedding_func, CachedOpenAIEmbeddings)
+
+def flatten_chunks(data: pa.Table) -> pa.Table:
+    """Rewrite an older table in the current chunk schema, keeping its vectors.
+
+    Older tables nest metadata in a struct or have no ids. Rows without a
+    source are replaced the next time their subject is ingested.
+    """
+    print("Migrating existing table to the current chunk schema")
+    if "metadata" in data.column_names:
+        metadata = data.column("metadata").combine_chunks()
+        columns = {column: metadata.field(column) for column in METADATA_COLUMNS}
+    else:
+        columns = {column: data.column(column) for column in METADATA_COLUMNS}
+    texts = data.column("text").to_pylist()
+    flat = pa.table({
+        "id": [stable_id(text) for text in texts],
+        "source_id": pa.nulls(len(texts), pa.string()),
+        "section_id": pa.nulls(len(texts), pa.string()),
+        "text": data.column("text"),
+        "vector": data.column("vector"),
+        **columns,
+    }).cast(Chunks.to_arrow_schema())
+    return flat
+
+def check_embedding_backend(table) -> None:
+    """Refuse to append to a table whose vectors came from a different model or dimension."""
+    config = table.embedding_functions.get("vector")
+    if config is None:
+        return
+    function = config.function
+    dimension = table.schema.field("vector").type.list_size
+    if function.name != embedding_func.name or dimension != embedding_func.ndims():
+        raise ValueError(
+            f"Table '{TABLE_NAME}' was built with {function.name} ({dimension} dimensions) but "
+            f"EMBEDDING_BACKEND={EMBEDDING_BACKEND} uses {embedding_func.name} ({embedding_func.ndims()} dimensions). "
+            "Switch the backend back or delete the table and re-ingest."
+        )
+
+def create_scalar_indexes(table) -> None:
+    """(Re)build the scalar indexes used to prefilter searches by metadata."""
+    for column, index_type in SCALAR_INDEXES.items():
+        table.create_scalar_index(column, index_type=index_type, replace=True)
+    print(f"Built scalar indexes on {', '.join(SCALAR_INDEXES)}")
+
+def create_fts_index(table) -> None:
+    """(Re)build the full-text index on chunk text used by hybrid search."""
+    table.create_fts_index("text", replace=True)
+    print("Built full-text index on text")
+
+def update_indexes(table) -> None:
+    """Rebuild scalar and full-text indexes and refresh the vector index after writes."""
+    create_scalar_indexes(table)
+    create_fts_index(table)
+    update_vector_index(table)
+
+def get_vector_index(table):
+    """Return the config of the index on the vector column, if there is one."""
+    for index in table.list_indices():
+        if list(index.columns) == ["vector"]:
+            return index
+    return None
+
+def update_vector_index(table) -> None:
+    """Build, refresh or retrain the IVF_PQ index depending on table size and growth."""
+    num_rows = table.count_rows()
+    index = get_vector_index(table)
+    if index is None and num_rows < VECTOR_INDEX_MIN_ROWS:
+        print(f"Skipping vector index: {num_rows} rows is below VECTOR_INDEX_MIN_ROWS ({VECTOR_INDEX_MIN_ROWS})")
+        return
+
+    if index is not None:
+        stats = table.index_stats(index.name)
+        if stats.num_unindexed_rows <= stats.num_indexed_rows * VECTOR_INDEX_REBUILD_FRACTION:
+            # Assign new rows to the existing partitions without retraining
+            table.optimize()
+            print(f"Added {stats.num_unindexed_rows} rows to the existing vector index")
+            return
+
+    # Around sqrt(n) partitions keeps both partition count and size balanced
+    num_partitions = max(1, int(num_rows ** 0.5))
+    table.create_index(
+        metric="l2",
+        vector_column_name="vector",
+        index_type="IVF_PQ",
+        num_partitions=num_partitions,
+        num_sub_vectors=embedding_func.ndims() // 16,
+        replace=True,
+    )
+    print(f"Built IVF_PQ index over {num_rows} rows with {num_partitions} partitions")
 
 class MarkdownProcessor:
     """Handles markdown document processing and metadata extraction."""
@@ -102,46 +301,74 @@ class MarkdownProcessor:
         print(f"Total sections found: {len(processed_sections)}")
         return processed_sections
 
+# Markdown-only converters, one per thread, as docling does not document converters as thread-safe
+_markdown_converters = threading.local()
+
+def markdown_to_document(markdown: str, name: str):
+    """Build a docling document from a markdown string; markdown skips the PDF layout models."""
+    converter = getattr(_markdown_converters, "converter", None)
+    if converter is None:
+        converter = DocumentConverter(allowed_formats=[InputFormat.MD])
+        _markdown_converters.converter = converter
+    return converter.convert(DocumentStream(name=name, stream=BytesIO(markdown.encode("utf-8")))).document
+
+def create_chunker() -> HybridChunker:
+    """Chunker sized and counted in the tokens of the configured embedding backend."""
+    if EMBEDDING_BACKEND == "openai":
+        chunk_tokenizer = tokenizer
+    else:
+        chunk_tokenizer = AutoTokenizer.from_pretrained(LOCAL_EMBEDDING_MODEL)
+    return HybridChunker(
+        tokenizer=chunk_tokenizer,
+        max_tokens=CHUNK_MAX_TOKENS,
+        merge_peers=True,
+    )
+
 class DocumentProcessor:
     """Handles document processing and chunking."""
     
-    def __init__(self, subject: str):
-        self.converter = DocumentConverter()
-        self.chunker = HybridChunker(
-            tokenizer=tokenizer,
-            max_tokens=MAX_TOKENS // 4,
-            merge_peers=True,
-        )
+    def __init__(self, subject: str, converter: DocumentConverter | None = None, chunker: HybridChunker | None = None):
+        # Pass a converter and chunker to share their loaded models between documents
+        self.converter = converter or DocumentConverter()
+        self.chunker = chunker or create_chunker()
         self.subject = self._standardize_filename_component(subject)
 
-    def process_markdown_batch(self, batch_content: str, batch_number: int, total_batches: int) -> Section | None:
+    def load_markdown(self, url: str) -> str:
+        """Convert a PDF to markdown, reusing the stored conversion if its bytes are unchanged."""
+        if url.startswith(("http://", "https://")):
+            with urllib.request.urlopen(url) as response:
+                content = response.read()
+        else:
+            content = Path(url).read_bytes()
+
+        cache_file = CONVERSION_CACHE_DIR / f"{hashlib.sha256(content).hexdigest()}.md"
+        if cache_file.exists():
+            print(f"Source unchanged since last conversion, reusing {cache_file.name}")
+            return cache_file.read_text()
+
+        name = Path(urllib.parse.urlparse(url).path).name or "document.pdf"
+        with CONVERSION_LOCK:
+            result = self.converter.convert(DocumentStream(name=name, stream=BytesIO(content)))
+        markdown = result.document.export_to_markdown()
+        CONVERSION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(markdown)
+        return markdown
+
+    def process_markdown_batch(self, batch_content: str, batch_number: int, total_batches: int, section_id: str) -> Section | None:
         """Process a batch of markdown content."""
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an assistant that helps structure educational curriculum content. Your task is to take markdown content and format it consistently and cleanly, optimizing for readability and proper markdown structure."
-                    },
-                    {
-                        "role": "user",
-                        "content": self._get_formatting_prompt(batch_content, batch_number, total_batches)
-                    }
-                ],
-                temperature=0.2,
-                max_tokens=4000
-            )
+            prompt = self._get_formatting_prompt(batch_content, batch_number, total_batches)
+            response = self._complete_with_retry(prompt, batch_number)
             
             processed_content = response.choices[0].message.content
             metadata = MarkdownProcessor.extract_metadata_from_markdown(processed_content)
             cleaned_content = MarkdownProcessor.clean_text_from_metadata(processed_content)
             
             if metadata["grade_level"] and metadata["subject_area"]:
-                self._save_processed_section(cleaned_content, metadata)
-                print(f"Processed and saved section {batch_number} with grade level: {metadata['grade_level']}, subject area: {metadata['subject_area']}")
-                return Section(content=cleaned_content, metadata=metadata)
+                print(f"Processed section {batch_number} with grade level: {metadata['grade_level']}, subject area: {metadata['subject_area']}")
+                return Section(content=cleaned_content, metadata=metadata, section_id=section_id)
             
+            print(f"Section {batch_number} dropped: no grade level or subject area in the formatted output")
             return None
             
         except Exception as e:
@@ -149,6 +376,44 @@ class DocumentProcessor:
             print("Content preview:", batch_content[:200])
             return None
 
+    def _complete_with_retry(self, prompt: str, batch_number: int):
+        """Call the formatting model within the shared quota, retrying transient errors with backoff."""
+        # The API counts max_tokens against the tokens-per-minute quota up front
+        tokens = tokenizer.count_tokens(prompt) + FORMATTING_MAX_TOKENS
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            llm_rate_limiter.acquire(tokens)
+            llm_concurrency.acquire()
+            start = time.perf_counter()
+            try:
+                response = client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are an assistant that helps structure educational curriculum content. Your task is to take markdown content and format it consistently and cleanly, optimizing for readability and proper markdown structure."
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    temperature=0.2,
+                    max_tokens=FORMATTING_MAX_TOKENS
+                )
+            except RETRYABLE_ERRORS as e:
+                llm_concurrency.release(time.perf_counter() - start, failed=True, rate_limited=isinstance(e, RateLimitError))
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                delay = retry_delay(e, attempt)
+                print(f"Formatting section {batch_number} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            except Exception:
+                llm_concurrency.release(time.perf_counter() - start, failed=True)
+                raise
+            llm_concurrency.release(time.perf_counter() - start)
+            return response
+
     def _get_formatting_prompt(self, content: str, batch_number: int, total_batches: int) -> str:
         """Generate the formatting prompt for the AI model."""
         return f"""
@@ -193,145 +458,303 @@ class DocumentProcessor:
         {content}
         """
 
-    def _save_processed_section(self, content: str, metadata: Dict[str, str | None]) -> None:
-        """Save processed section to a file with standardized naming. Appends if file exists."""
-        os.makedirs(CURRENT_DIR / "temp", exist_ok=True)
-        
-        # Standardize grade level and use the standardized subject from initialization
-        grade_level = self._standardize_filename_component(metadata.get('grade_level', ''))
-        
-        # Create filename in format: {grade}-{subject}.md
-        filename = f"{grade_level}-{self.subject}.md"
-        filepath = CURRENT_DIR / "temp" / filename
-        
-        # If file exists, append content with a section separator
-        if filepath.exists():
-            with open(filepath, 'a') as file:
-                file.write("\n\n---\n\n")  # Add a clear section separator
-                file.write(content)
-            print(f"Appended content to existing file: {filename}")
-        else:
-            # Create new file if it doesn't exist
-            with open(filepath, 'w') as file:
-                file.write(content)
-            print(f"Created new file: {filename}")
-
-    def chunk_document(self, url: str) -> List[dict]:
-        """Process and chunk a document from the given URL."""
-        result = self.converter.convert(url)
-        markdown = result.document.export_to_markdown()        
-        print("\nSplitting into sections...")
-        sections = MarkdownProcessor.split_by_area_of_learning(markdown)
-        print(f"Found {len(sections)} sections")
-        for i, section in enumerate(sections):
-            print(f"\nSection {i+1} preview ({len(section)} chars):", section[:200])
-        
-        processed_sections = []
-
-        print(f"\nProcessing {len(sections)} Areas of Learning...")
-
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            future_to_section = {
-                executor.submit(self.process_markdown_batch, section, i + 1, len(sections)): i 
-                for i, section in enumerate(sections)
-            }
-            
-            for future in as_completed(future_to_section):
-                section_idx = future_to_section[future]
-                try:
-                    result = future.result()
-                    if result:
-                        processed_sections.append(result)
-                        print(f"Successfully processed section {section_idx + 1}")
-                    else:
-                        print(f"Section {section_idx + 1} processing failed - no valid metadata found")
-                except Exception as e:
-                    print(f"Section {section_idx + 1} generated an exception: {str(e)}")
-                    traceback.print_exc()
-
-        print(f"\nSuccessfully processed {len(processed_sections)} sections out of {len(sections)} total")
-        return self._process_sections_to_chunks(processed_sections)
-
-    def _process_sections_to_chunks(self, processed_sections: List[Section]) -> List[dict]:
-        """Process sections into database chunks."""
-        db = lancedb.connect(LANCEDB_PATH)
-        
-        try:
-            table = db.create_table(TABLE_NAME, schema=Chunks)
-            print("Created new table")
-        except Exception:
-            table = db.open_table(TABLE_NAME)
-            print("Using existing table")
-
-        all_chunks = []
-        for file in (CURRENT_DIR / "temp").glob("*.md"):
-            chunks = self._process_file_to_chunks(file)
-            if chunks:
-                table.add(chunks)
-                all_chunks.extend(chunks)
-                print(f"Added {len(chunks)} chunks to database from {file.name}")
-                # Delete the temporary file after successful processing
-                file.unlink()
-                print(f"Deleted temporary file: {file.name}")
-            else:
-                print(f"No chunks processed from {file.name}")
-                # Delete empty/failed files as well
-                file.unlink()
-                print(f"Deleted empty temporary file: {file.name}")
-
-        return all_chunks
-
-    def _process_file_to_chunks(self, file: Path) -> List[dict]:
-        """Process a single file into chunks."""
-        conversion_result = self.converter.convert(file)
-        dl_doc = conversion_result.document
+    def stored_section_ids(self, table, source_id: str) -> set:
+        """Ids of the sections of a source that already have chunks in the table."""
+        rows = table.search().where(f"source_id = '{source_id}'").select(["section_id"]).limit(None).to_arrow()
+        return set(rows.column("section_id").to_pylist())
+
+    def remove_stale_rows(self, table, source_id: str, section_ids: List[str]) -> int:
+        """Delete chunks of sections no longer in the source, and pre-id rows of this subject."""
+        # LanceDB rejects an empty IN list; a source with no sections leaves all of its rows stale
+        stale_sections = f" AND section_id NOT IN ({sql_list(section_ids)})" if section_ids else ""
+        condition = (
+            f"(source_id = '{source_id}'{stale_sections})"
+            f" OR (source_id IS NULL AND subject_area = '{self.subject.replace('_', ' ')}')"
+        )
+        with TABLE_WRITE_LOCK:
+            stale = table.count_rows(condition)
+            if stale:
+                table.delete(condition)
+                print(f"Deleted {stale} chunks of sections that changed or left the source")
+        return stale
+
+    def section_to_chunks(self, section: Section, grade_level: str, source_id: str) -> List[dict]:
+        """Chunk a formatted section from its markdown, without writing it to disk."""
+        dl_doc = markdown_to_document(section.content, f"{section.section_id}.md")
         chunks = list(self.chunker.chunk(dl_doc=dl_doc))
-        print(f"Found {len(chunks)} chunks in {file.name}")
-        
+
         processed_chunks = []
         for chunk in chunks:
-            # Extract grade level from standardized filename
-            grade_str = file.stem.split("-")[0]
-            
-            # Convert grade level back to readable format
-            if grade_str == "kindergarten" or grade_str == "00":
-                grade_level = "Kindergarten"
-            else:
-                try:
-                    grade_level = str(int(grade_str))  # Remove leading zero
-                except ValueError:
-                    print(f"Warning: Invalid grade level '{grade_str}' in filename {file.name}")
-                    continue  # Skip this chunk if grade level is invalid
-                
             section_type = chunk.meta.headings[0] if chunk.meta and chunk.meta.headings else None
 
-            metadata = {
-                "grade_level": grade_level,
-                "section_type": section_type,
-                "subject_area": self.subject.replace('_', ' '),
-            }
-
             combined_text = f"{grade_level} {self.subject.replace('_', ' ')} {section_type}: \n{chunk.text}"
             processed_chunks.append({
+                "id": stable_id(section.section_id, combined_text),
+                "source_id": source_id,
+                "section_id": section.section_id,
                 "text": combined_text,
-                "metadata": metadata
+                "grade_level": grade_level,
+                "section_type": section_type,
+                "subject_area": self.subject.replace('_', ' '),
             })
             
         return processed_chunks
 
+    def normalize_grade_level(self, grade: str) -> str | None:
+        """Map the formatter's grade level to the stored value ("Kindergarten" or a number)."""
+        grade_str = self._standardize_filename_component(grade)
+        if grade_str == "kindergarten" or grade_str == "00":
+            return "Kindergarten"
+        try:
+            return str(int(grade_str))  # Remove leading zero
+        except ValueError:
+            return None
+
     def _standardize_filename_component(self, component: str) -> str:
         """Standardize the filename component."""
         return component.strip().lower().replace(" ", "_")
 
-def process_pdf(url: str, subject: str) -> bool:
+@dataclass
+class SourceDocument:
+    """A PDF moving through the ingest pipeline, with its per-document counters."""
+    url: str
+    processor: DocumentProcessor
+    source_id: str = ""
+    section_ids: List[str] = field(default_factory=list)
+    markdown: str | None = None
+    # True once the document is converted and split into sections
+    converted: bool = False
+    pending: int = 0
+    formatted: int = 0
+    dropped: int = 0
+    chunks: int = 0
+    changed: bool = False
+    started: float = 0.0
+    finished: float = 0.0
+
+    @property
+    def subject(self) -> str:
+        return self.processor.subject
+
+    @property
+    def unchanged(self) -> bool:
+        return self.converted and not self.pending
+
+    @property
+    def success(self) -> bool:
+        return self.chunks > 0 or self.unchanged
+
+    @property
+    def seconds(self) -> float:
+        return max(0.0, self.finished - self.started)
+
+@dataclass
+class PendingSection:
+    """A raw section of a document waiting for GPT formatting."""
+    document: SourceDocument
+    number: int
+    total: int
+    content: str
+    section_id: str
+
+class IngestPipeline:
+    """Streams PDFs through convert → split → format → chunk → embed → write.
+
+    Stages run concurrently on their own worker pools and are joined by
+    bounded queues, so embedding starts as soon as the first section is
+    formatted and memory stays bounded by the queue sizes. Chunks of
+    sections that changed or left a source are deleted once every stage has
+    drained. Every completed stage is checkpointed in an IngestJournal, so a
+    resumed run skips GPT formatting and embedding already paid for.
+    """
+
+    def __init__(
+        self,
+        table,
+        converter: DocumentConverter | None = None,
+        chunker: HybridChunker | None = None,
+        convert_workers: int = INGEST_CONVERT_WORKERS,
+        format_workers: int = LLM_MAX_CONCURRENCY,
+        chunk_workers: int = INGEST_CHUNK_WORKERS,
+        embed_workers: int = INGEST_EMBED_WORKERS,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        embed_batch_size: int = INGEST_EMBED_BATCH_SIZE,
+        write_batch_rows: int = LANCEDB_WRITE_BATCH_ROWS,
+        journal: IngestJournal | None = None,
+    ):
+        self.table = table
+        self.journal = journal or IngestJournal(INGEST_JOURNAL_PATH)
+        # Sections an interrupted run left incomplete; reprocessed even if some chunks are stored
+        self._incomplete = set()
+        # Sections sent to the formatting model and the span of those calls, for sections/min
+        self._format_calls = 0
+        self._format_started = None
+        self._format_finished = 0.0
+        # Docling's layout models and the tokenizer are loaded once for every document
+        self.converter = converter or DocumentConverter()
+        self.chunker = chunker or create_chunker()
+        self.embedder = BulkEmbedder(
+            embedding_func,
+            count_tokens_batch=tokenizer.count_tokens_batch,
+            concurrency=1,
+            rate_limiter=embedding_rate_limiter,
+        )
+        self._lock = threading.Lock()
+        self.pipeline = Pipeline([
+            Stage("convert", self._convert, workers=convert_workers, queue_size=queue_size),
+            # Converted markdown is the largest item, so few wait to be split
+            Stage("split", self._split, workers=1, queue_size=2),
+            # Enough workers for the highest concurrency; llm_concurrency sets how many call at once
+            Stage("format", self._format, workers=format_workers, queue_size=queue_size),
+            Stage("chunk", self._chunk, workers=chunk_workers, queue_size=queue_size),
+            Stage("embed", self._embed, workers=embed_workers, queue_size=embed_batch_size * 2, batch_size=embed_batch_size),
+            # Writes flush only when full or at the end, since every merge_insert commits a new fragment
+            Stage("write", self._write, queue_size=write_batch_rows, batch_size=write_batch_rows, max_wait=None),
+        ])
+
+    def run(self, sources: List[Tuple[str, str]], build_indexes: bool = True, resume: bool = False) -> List[SourceDocument]:
+        """Ingest (url, subject) pairs and return each document's counters.
+
+        With resume, sections and chunks checkpointed by the last unfinished
+        run are reused instead of being formatted or embedded again.
+        """
+        incomplete = self.journal.start(resume)
+        if resume:
+            self._incomplete = incomplete
+        elif incomplete:
+            # Without their checkpoints, partly written sections must be processed from scratch
+            with TABLE_WRITE_LOCK:
+                self.table.delete(f"section_id IN ({sql_list(incomplete)})")
+            print(f"Discarded {len(incomplete)} sections left incomplete by an unfinished run")
+
+        documents = [
+            SourceDocument(url, DocumentProcessor(subject, converter=self.converter, chunker=self.chunker))
+            for url, subject in sources
+        ]
+        self.pipeline.run(documents)
+
+        for document in documents:
+            # A document that never split has no section ids, so nothing can be judged stale
+            if document.converted:
+                removed = document.processor.remove_stale_rows(self.table, document.source_id, document.section_ids)
+                document.changed = bool(document.chunks or removed)
+
+        self.journal.finish()
+        self.pipeline.report()
+        self._report_formatting(documents)
+        self.embedder.report(self.table, self.pipeline.seconds)
+        if build_indexes and any(document.changed for document in documents):
+            update_indexes(self.table)
+        return documents
+
+    def _report_formatting(self, documents: List[SourceDocument]) -> None:
+        minutes = (self._format_finished - self._format_started) / 60 if self._format_started else 0.0
+        rate = self._format_calls / minutes if minutes else 0.0
+        dropped = sum(document.dropped for document in documents)
+        print(
+            f"Formatted {self._format_calls} sections with the LLM ({rate:.1f} sections/min), {dropped} dropped; "
+            f"{llm_concurrency.summary()}"
+        )
+
+    def _convert(self, document: SourceDocument) -> Iterator[SourceDocument]:
+        document.started = time.perf_counter()
+        print(f"\nStarting to process PDF from {document.url} for {document.subject}")
+        document.markdown = document.processor.load_markdown(document.url)
+        yield document
+
+    def _split(self, document: SourceDocument) -> Iterator[PendingSection]:
+        sections = MarkdownProcessor.split_by_area_of_learning(document.markdown)
+        document.markdown = None
+        document.source_id = stable_id(document.url)
+        document.section_ids = [stable_id(document.source_id, section) for section in sections]
+        stored = document.processor.stored_section_ids(self.table, document.source_id) - self._incomplete
+        # Repeated sections share an id, so only the first copy is processed
+        first_index = {section_id: i for i, section_id in reversed(list(enumerate(document.section_ids)))}
+        pending = sorted(i for section_id, i in first_index.items() if section_id not in stored)
+        document.pending = len(pending)
+        document.converted = True
+        document.finished = time.perf_counter()
+        print(
+            f"[{document.subject}] {len(sections)} sections, {len(first_index) - len(pending)} unchanged "
+            f"since the last ingest, {len(pending)} to process"
+        )
+        for i in pending:
+            yield PendingSection(document, i + 1, len(sections), sections[i], document.section_ids[i])
+
+    def _format(self, pending: PendingSection) -> Iterator[Tuple[SourceDocument, Section]]:
+        document = pending.document
+        checkpoint = self.journal.formatted_section(pending.section_id)
+        if checkpoint:
+            content, metadata = checkpoint
+            section = Section(content=content, metadata=metadata, section_id=pending.section_id)
+        else:
+            start = time.perf_counter()
+            section = document.processor.process_markdown_batch(pending.content, pending.number, pending.total, pending.section_id)
+            if section:
+                self.journal.record_formatted(document.source_id, section.section_id, section.content, section.metadata)
+            with self._lock:
+                self._format_calls += 1
+                self._format_started = min(self._format_started or start, start)
+                self._format_finished = time.perf_counter()
+        with self._lock:
+            if section:
+                document.formatted += 1
+            else:
+                document.dropped += 1
+            print(f"[{document.subject}] {document.formatted}/{document.pending} sections formatted, {document.dropped} dropped")
+        if section:
+            yield document, section
+
+    def _chunk(self, item: Tuple[SourceDocument, Section]) -> Iterator[Tuple[SourceDocument, dict]]:
+        document, section = item
+        grade_level = document.processor.normalize_grade_level(section.metadata["grade_level"])
+        if grade_level is None:
+            print(f"Warning: Invalid grade level '{section.metadata['grade_level']}', skipping section {section.section_id}")
+            self.journal.record_dropped_section(section.section_id)
+            return
+        chunks = document.processor.section_to_chunks(section, grade_level, document.source_id)
+        self.journal.record_chunked(section.section_id, [chunk["id"] for chunk in chunks])
+        for chunk in chunks:
+            yield document, chunk
+
+    def _embed(self, batch: List[Tuple[SourceDocument, dict]]) -> Iterator[Tuple[SourceDocument, dict]]:
+        documents = {chunk["id"]: document for document, chunk in batch}
+        checkpointed = self.journal.embedded_vectors(list(documents))
+        missing = [chunk for _, chunk in batch if chunk["id"] not in checkpointed]
+        embedded, rejected = self.embedder.embed_rows(missing)
+        self.journal.record_embedded(embedded)
+        # Chunks whose batch ran out of retries stay unsettled, so their section
+        # is left incomplete and --resume embeds them again
+        self.journal.record_dropped_chunks(rejected)
+
+        for _, chunk in batch:
+            if chunk["id"] in checkpointed:
+                yield documents[chunk["id"]], {**chunk, "vector": checkpointed[chunk["id"]]}
+        for row in embedded:
+            yield documents[row["id"]], row
+
+    def _write(self, batch: List[Tuple[SourceDocument, dict]]) -> None:
+        # Identical chunks in one batch would make the upsert ambiguous
+        rows = {row["id"]: (document, row) for document, row in batch}
+        self.embedder.write(self.table, [row for _, row in rows.values()])
+        self.journal.record_written([row for _, row in rows.values()])
+        now = time.perf_counter()
+        with self._lock:
+            for document, _ in rows.values():
+                document.chunks += 1
+                document.finished = now
+
+def process_pdf(url: str, subject: str, resume: bool = False) -> bool:
     """Main function to process a PDF document."""
     try:
-        print(f"\nStarting to process PDF from {url} for {subject}")
-        processor = DocumentProcessor(subject)
-        chunks = processor.chunk_document(url)
+        table = open_chunks_table(lancedb.connect(LANCEDB_PATH))
+        [document] = IngestPipeline(table).run([(url, subject)], resume=resume)
         
-        if chunks:
-            print(f"Document processed into {len(chunks)} chunks")
+        if document.chunks:
+            print(f"Document processed into {document.chunks} chunks")
+            return True
+        elif document.unchanged:
+            print("No new chunks: every section is unchanged since the last ingest")
             return True
         else:
             print("No chunks to add to database")
@@ -350,11 +773,12 @@ def main():
     parser = argparse.ArgumentParser(description="Process PDF and create embeddings")
     parser.add_argument("url", help="URL of the PDF to process")
     parser.add_argument("--subject", required=True, help="Name of the subject (e.g., 'social studies', 'arts education')")
+    parser.add_argument("--resume", action="store_true", help="Continue the last interrupted run from its checkpoints")
     args = parser.parse_args()
 
     print(f"Processing {args.url} for {args.subject}")
     
-    success = process_pdf(args.url, args.subject)
+    success = process_pdf(args.url, args.subject, resume=args.resume)
     if success:
         print(f"Successfully processed {args.url}")
         sys.exit(0)
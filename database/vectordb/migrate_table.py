@@ -0,0 +1,19 @@
+import argparse
+
+import lancedb
+
+from embedding import LANCEDB_PATH, TABLE_NAME, open_chunks_table
+
+def main():
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Migrate the chunks table to the current schema and cached embedding function")
+    parser.parse_args()
+
+    db = lancedb.connect(LANCEDB_PATH)
+    if TABLE_NAME not in db.table_names():
+        print(f"No {TABLE_NAME} table at {LANCEDB_PATH}; nothing to migrate")
+        return
+    open_chunks_table(db)
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,21 @@
-import subprocess
-import os
+import argparse
+import time
 from typing import List, Dict
-import sys
+
+import lancedb
 from dotenv import load_dotenv
 
+from embedding import (
+    LANCEDB_PATH,
+    IngestPipeline,
+    embedding_rate_limiter,
+    llm_rate_limiter,
+    open_chunks_table,
+)
+
 # Load environment variables
 load_dotenv()
 
-def run_embedding_command(url: str, subject: str) -> bool:
-    """Run embedding command for a PDF URL."""
-    command = [
-        sys.executable, 
-        "./vectordb/embedding.py",
-        url,
-        "--subject", subject
-    ]
-    
-    try:
-        print(f"\nProcessing: {url}")
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        print(result.stdout)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\nError processing PDF:")
-        print(f"Exit code: {e.returncode}")
-        print(f"Output: {e.stdout}")
-        print(f"Error: {e.stderr}")
-        return False
-    except Exception as e:
-        print(f"\nUnexpected error:")
-        print(f"Error type: {type(e).__name__}")
-        print(f"Error message: {str(e)}")
-        return False
-
 def get_core_subject_pdfs() -> List[Dict[str, str]]:
     """Return list of URLs and their types to process."""
     return [
@@ -63,24 +46,34 @@ def get_core_subject_pdfs() -> List[Dict[str, str]]:
     ]
 
 def main():
-    urls = get_core_subject_pdfs()
-    
-    total = len(urls)
-    successful = 0
-    failed = 0
+    parser = argparse.ArgumentParser(description="Ingest the core subject curriculum PDFs")
+    parser.add_argument("--resume", action="store_true", help="Continue the last interrupted run from its checkpoints")
+    args = parser.parse_args()
 
+    items = get_core_subject_pdfs()
+    total = len(items)
     print(f"Processing {total} URLs")
-    
-    for item in urls:
-        if run_embedding_command(item["url"], item["subject"]):
-            successful += 1
-        else:
-            failed += 1
+    start = time.perf_counter()
+
+    # One pipeline streams every document, so all of them share the converter,
+    # chunker, worker pools and rate limiters
+    table = open_chunks_table(lancedb.connect(LANCEDB_PATH))
+    documents = IngestPipeline(table).run([(item["url"], item["subject"]) for item in items], resume=args.resume)
 
+    successful = sum(document.success for document in documents)
     print(f"\nFinal Results:")
+    for document in documents:
+        print(
+            f"  {document.subject:<28} {'ok' if document.success else 'failed':<7} {document.chunks:>6} chunks "
+            f"{document.formatted:>4}/{document.pending:<4} sections {document.dropped:>3} dropped {document.seconds:>8.1f}s"
+        )
     print(f"Successfully processed: {successful}")
-    print(f"Failed to process: {failed}")
+    print(f"Failed to process: {total - successful}")
     print(f"Total URLs: {total}")
+    print(f"LLM rate limiter: {llm_rate_limiter.summary()}")
+    if embedding_rate_limiter:
+        print(f"Embedding rate limiter: {embedding_rate_limiter.summary()}")
+    print(f"Wall-clock time: {time.perf_counter() - start:.1f}s")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,20 @@
+import importlib.util
+import os
+import sys
+
+# The backend is deployed without this directory, so it owns modules both sides
+# need; ingestion loads those files by path (both trees have a top-level "utils"
+# package) instead of keeping copies that drift apart
+BACKEND_UTILS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "backend", "app", "utils")
+
+
+def load_backend_module(name: str):
+    """Import backend/app/utils/<name>.py once, as "backend_<name>"."""
+    module_name = f"backend_{name}"
+    module = sys.modules.get(module_name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(BACKEND_UTILS_DIR, f"{name}.py"))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return module
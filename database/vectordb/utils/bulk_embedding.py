@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pyarrow as pa
+from dotenv import load_dotenv
+
+from utils.rate_limit import RETRYABLE_ERRORS, RateLimiter, retry_delay
+
+load_dotenv()
+
+# OpenAI accepts up to 2048 inputs and 300k tokens per embeddings request;
+# stay under both so one oversized chunk never fails a whole batch
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 2048))
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", 250_000))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", 4))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", 6))
+# Rows buffered by the ingest pipeline before one write to LanceDB; each write creates a new fragment
+LANCEDB_WRITE_BATCH_ROWS = int(os.getenv("LANCEDB_WRITE_BATCH_ROWS", 10_000))
+
+# Serializes writes from concurrent ingests so LanceDB commits never conflict
+TABLE_WRITE_LOCK = threading.Lock()
+
+
+@dataclass
+class EmbeddingStats:
+    """Counters for one bulk embedding run."""
+    chunks: int = 0
+    batches: int = 0
+    retries: int = 0
+    # Rows the API rejected, which no retry can embed
+    dropped: int = 0
+    # Rows whose batch ran out of retries; a later run can still embed them
+    failed: int = 0
+    writes: int = 0
+
+
+def count_fragments(table) -> int:
+    """Number of data fragments in a LanceDB table."""
+    return table.stats()["fragment_stats"]["num_fragments"]
+
+
+class BulkEmbedder:
+    """Embeds chunks in token-budgeted batches and writes them with large upserts.
+
+    embed_rows and write are safe to call from several threads at once.
+    Batches within one call run on a bounded thread pool. Rate-limit and transient API errors are
+    retried with exponential backoff and jitter, honouring Retry-After when the
+    API sends it. Vectors are added to the rows before they are written, so
+    LanceDB does not embed them again. Rows are merged on their "id" column,
+    so writing the same chunks twice leaves one copy. A shared rate limiter
+    keeps concurrent embedders in one process within the API quota.
+    """
+
+    def __init__(
+        self,
+        embedding_func,
+        count_tokens_batch: Callable[[Sequence[str]], List[int]],
+        max_batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+        concurrency: int = EMBEDDING_CONCURRENCY,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.embedding_func = embedding_func
+        self.count_tokens_batch = count_tokens_batch
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter
+        self.stats = EmbeddingStats()
+        self._lock = threading.Lock()
+
+    def make_batches(self, token_counts: Sequence[int]) -> List[List[int]]:
+        """Group text indexes into batches under both the size and token budgets."""
+        batches, batch, batch_tokens = [], [], 0
+        for i, tokens in enumerate(token_counts):
+            if batch and (len(batch) >= self.max_batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(i)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _embed_batch(self, texts: List[str], tokens: int) -> list:
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire(tokens)
+            try:
+                return self.embedding_func.compute_source_embeddings(texts)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    self.stats.retries += 1
+                delay = retry_delay(e, attempt)
+                print(f"Embedding batch of {len(texts)} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed(self, texts: Sequence[str]) -> Tuple[list, Set[int]]:
+        """Embed texts in order.
+
+        Returns the vectors, with None for entries the API rejects, and the
+        indexes of texts whose batch still failed after its retries.
+        """
+        vectors = [None] * len(texts)
+        failed: Set[int] = set()
+        token_counts = self.count_tokens_batch(texts)
+        batches = self.make_batches(token_counts)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [
+                executor.submit(self._embed_batch, [texts[i] for i in batch], sum(token_counts[i] for i in batch))
+                for batch in batches
+            ]
+            for batch, future in zip(batches, futures):
+                try:
+                    batch_vectors = future.result()
+                except Exception as e:
+                    # The rest of the ingest continues; these texts were not rejected, so a later run can retry them
+                    print(f"Embedding batch of {len(batch)} failed after retries ({type(e).__name__}: {e}), skipping it")
+                    failed.update(batch)
+                    continue
+                for i, vector in zip(batch, batch_vectors):
+                    vectors[i] = vector
+        with self._lock:
+            self.stats.batches += len(batches)
+        return vectors, failed
+
+    def embed_rows(self, rows: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Return the rows with a "vector" added, and the rows the API rejected.
+
+        Rows whose batch failed after its retries are in neither list.
+        """
+        vectors, failed = self.embed([row["text"] for row in rows])
+        embedded, rejected = [], []
+        for i, (row, vector) in enumerate(zip(rows, vectors)):
+            if vector is not None:
+                embedded.append({**row, "vector": np.asarray(vector, dtype=np.float32)})
+            elif i not in failed:
+                rejected.append(row)
+        with self._lock:
+            self.stats.dropped += len(rejected)
+            self.stats.failed += len(failed)
+        return embedded, rejected
+
+    def write(self, table, rows: List[Dict]) -> None:
+        """Upsert embedded rows into the table in one commit."""
+        if not rows:
+            return
+        vectors = np.stack([row["vector"] for row in rows])
+        data = pa.table({
+            **{column: [row[column] for row in rows] for column in rows[0] if column != "vector"},
+            "vector": pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel()), vectors.shape[1]),
+        })
+        with TABLE_WRITE_LOCK:
+            table.merge_insert("id").when_matched_update_all().when_not_matched_insert_all().execute(data)
+        with self._lock:
+            self.stats.writes += 1
+            self.stats.chunks += len(rows)
+
+    def report(self, table, seconds: float) -> None:
+        stats = self.stats
+        rate = stats.chunks / seconds if seconds else 0.0
+        print(
+            f"Embedded {stats.chunks} chunks in {seconds:.1f}s ({rate:.1f} chunks/sec) "
+            f"across {stats.batches} batches and {stats.writes} writes; "
+            f"{stats.retries} retries, {stats.failed} failed, {stats.dropped} dropped; table has {count_fragments(table)} fragments"
+        )
@@ -0,0 +1,40 @@
+import os
+
+from dotenv import load_dotenv
+from lancedb.embeddings import get_registry
+
+from utils.embedding_cache import CachedOpenAIEmbeddings  # noqa: F401 registers "openai-cached"
+
+load_dotenv()
+
+# "openai" calls the OpenAI API (through the on-disk cache), "local" runs a
+# sentence-transformers model on CPU with batched inputs across all cores
+EMBEDDING_BACKENDS = ("openai", "local")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+
+
+def create_embedding_function(backend: str = EMBEDDING_BACKEND, cached: bool = True):
+    """Create the LanceDB embedding function for a backend.
+
+    LanceDB stores the function's registry name and config in the table schema,
+    so tables remember which backend and model built them and searches embed
+    queries with the same encoder.
+
+    Args:
+        backend: One of EMBEDDING_BACKENDS
+        cached: Use the on-disk cache in front of the OpenAI API
+
+    Returns:
+        The embedding function
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    registry = get_registry()
+    if backend == "openai":
+        return registry.get("openai-cached" if cached else "openai").create(name=OPENAI_EMBEDDING_MODEL)
+    if backend == "local":
+        return registry.get("sentence-transformers").create(name=LOCAL_EMBEDDING_MODEL, device="cpu", normalize=True)
+    raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
@@ -0,0 +1,10 @@
+from utils.backend_modules import load_backend_module
+
+# One module registers the "openai-cached" embedding function and owns the cache
+# format, so tables created here can be opened and queried by the backend
+_module = load_backend_module("embedding_cache")
+_module.set_default_cache_path("vectordb/data/embedding_cache.sqlite3")
+
+EmbeddingCache = _module.EmbeddingCache
+CachedOpenAIEmbeddings = _module.CachedOpenAIEmbeddings
+get_embedding_cache = _module.get_embedding_cache
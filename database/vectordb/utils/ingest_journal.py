@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Lookups and updates are split into batches below SQLite's bound-parameter limit
+SQLITE_BATCH_SIZE = 500
+
+
+class IngestJournal:
+    """Durable checkpoints of an ingest run in a SQLite file.
+
+    Sections and chunks are keyed by their content-hash ids, so checkpoints
+    stay valid across processes. A section moves through formatted →
+    chunked → written, keeping its GPT output; a chunk through embedded →
+    written (or dropped), keeping its vector. A section is written once all
+    of its chunks are. When a run finishes with every section written the
+    checkpoints are pruned; otherwise the run stays open for --resume.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.run_id: Optional[int] = None
+        self._local = threading.local()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    status TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS sections (
+                    section_id TEXT PRIMARY KEY,
+                    source_id TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    expected_chunks INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS chunks (
+                    chunk_id TEXT PRIMARY KEY,
+                    section_id TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    vector BLOB
+                );
+                CREATE INDEX IF NOT EXISTS idx_chunks_section_id ON chunks(section_id);
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def start(self, resume: bool) -> Set[str]:
+        """Open a run and return the ids of sections left incomplete by an earlier one.
+
+        With resume, the last unfinished run continues and its checkpoints are
+        reused. Without it, unfinished runs are discarded along with their
+        checkpoints; the caller should delete the returned sections' rows
+        from the table so they are processed again.
+        """
+        incomplete = self.incomplete_section_ids()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT run_id FROM runs WHERE finished_at IS NULL ORDER BY run_id DESC LIMIT 1"
+            ).fetchone()
+            if resume and row:
+                self.run_id = row[0]
+                (formatted,) = conn.execute("SELECT COUNT(*) FROM sections").fetchone()
+                (embedded,) = conn.execute("SELECT COUNT(*) FROM chunks WHERE vector IS NOT NULL").fetchone()
+                print(f"Resuming run {self.run_id}: {formatted} formatted sections and {embedded} embedded chunks checkpointed")
+                return incomplete
+
+            if resume:
+                print("No unfinished run to resume, starting a new one")
+            conn.execute("UPDATE runs SET finished_at = ?, status = 'discarded' WHERE finished_at IS NULL", (time.time(),))
+            conn.execute("DELETE FROM sections")
+            conn.execute("DELETE FROM chunks")
+            self.run_id = conn.execute(
+                "INSERT INTO runs (started_at, status) VALUES (?, 'running')", (time.time(),)
+            ).lastrowid
+        return incomplete
+
+    def incomplete_section_ids(self) -> Set[str]:
+        with self._connection() as conn:
+            rows = conn.execute("SELECT section_id FROM sections WHERE state != 'written'").fetchall()
+        return {row[0] for row in rows}
+
+    def formatted_section(self, section_id: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """Checkpointed GPT output and metadata for a section, if any."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT content, metadata FROM sections WHERE section_id = ?", (section_id,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def record_formatted(self, source_id: str, section_id: str, content: str, metadata: Dict[str, str]) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO sections (section_id, source_id, state, content, metadata) VALUES (?, ?, 'formatted', ?, ?)
+                ON CONFLICT(section_id) DO NOTHING
+                """,
+                (section_id, source_id, content, json.dumps(metadata)),
+            )
+
+    def record_dropped_section(self, section_id: str) -> None:
+        """Forget a section that produced no chunks so the run can still complete."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sections WHERE section_id = ?", (section_id,))
+
+    def record_chunked(self, section_id: str, chunk_ids: Sequence[str]) -> None:
+        expected = len(set(chunk_ids))
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE sections SET state = ?, expected_chunks = ? WHERE section_id = ? AND state != 'written'",
+                ("written" if expected == 0 else "chunked", expected, section_id),
+            )
+
+    def embedded_vectors(self, chunk_ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Checkpointed vectors for the given chunks; missing chunks are absent."""
+        found = {}
+        unique_ids = list(dict.fromkeys(chunk_ids))
+        with self._connection() as conn:
+            for start in range(0, len(unique_ids), SQLITE_BATCH_SIZE):
+                batch = unique_ids[start:start + SQLITE_BATCH_SIZE]
+                rows = conn.execute(
+                    f"SELECT chunk_id, vector FROM chunks WHERE vector IS NOT NULL AND chunk_id IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                found.update((chunk_id, np.frombuffer(vector, dtype=np.float32)) for chunk_id, vector in rows)
+        return found
+
+    def record_embedded(self, rows: List[Dict]) -> None:
+        """Checkpoint embedded chunk rows (with "id", "section_id" and "vector")."""
+        items = [
+            (row["id"], row["section_id"], np.asarray(row["vector"], dtype=np.float32).tobytes())
+            for row in rows
+        ]
+        with self._connection() as conn:
+            conn.executemany(
+                """
+                INSERT INTO chunks (chunk_id, section_id, state, vector) VALUES (?, ?, 'embedded', ?)
+                ON CONFLICT(chunk_id) DO UPDATE SET vector = excluded.vector
+                """,
+                items,
+            )
+
+    def record_dropped_chunks(self, rows: List[Dict]) -> None:
+        """Mark chunks the embedding API rejected so their sections can still complete."""
+        self._set_chunk_state(rows, "dropped")
+
+    def record_written(self, rows: List[Dict]) -> None:
+        """Mark chunks as stored in the table."""
+        self._set_chunk_state(rows, "written")
+
+    def _set_chunk_state(self, rows: List[Dict], state: str) -> None:
+        """Update chunk states, then complete the sections whose chunks are all settled."""
+        with self._connection() as conn:
+            conn.executemany(
+                """
+                INSERT INTO chunks (chunk_id, section_id, state) VALUES (?, ?, ?)
+                ON CONFLICT(chunk_id) DO UPDATE SET state = excluded.state
+                """,
+                [(row["id"], row["section_id"], state) for row in rows],
+            )
+
+        section_ids = list({row["section_id"] for row in rows})
+        with self._connection() as conn:
+            for start in range(0, len(section_ids), SQLITE_BATCH_SIZE):
+                batch = section_ids[start:start + SQLITE_BATCH_SIZE]
+                conn.execute(
+                    f"""
+                    UPDATE sections SET state = 'written'
+                    WHERE section_id IN ({','.join('?' * len(batch))}) AND state = 'chunked'
+                    AND expected_chunks <= (
+                        SELECT COUNT(*) FROM chunks
+                        WHERE chunks.section_id = sections.section_id AND chunks.state IN ('written', 'dropped')
+                    )
+                    """,
+                    batch,
+                )
+
+    def finish(self) -> int:
+        """Close the run if every section is written; returns the number still incomplete."""
+        incomplete = len(self.incomplete_section_ids())
+        if incomplete:
+            print(f"{incomplete} sections are incomplete; rerun with --resume to continue from the checkpoints")
+            return incomplete
+        with self._connection() as conn:
+            conn.execute("UPDATE runs SET finished_at = ?, status = 'complete' WHERE run_id = ?", (time.time(), self.run_id))
+            conn.execute("DELETE FROM sections")
+            conn.execute("DELETE FROM chunks")
+        return 0
@@ -0,0 +1,180 @@
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Counters for one pipeline stage."""
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+    queue_depth_total: int = 0
+    queue_depth_samples: int = 0
+
+    @property
+    def mean_queue_depth(self) -> float:
+        return self.queue_depth_total / self.queue_depth_samples if self.queue_depth_samples else 0.0
+
+
+class Stage:
+    """One step of a Pipeline, run by its own pool of worker threads.
+
+    fn receives one input item, or a list of up to batch_size items when
+    batch_size > 1, and returns an iterable of outputs for the next stage
+    (or None). A batch is handed over once it is full or max_wait seconds
+    pass without it filling; with max_wait=None only a full batch or the end
+    of input hands it over. Exceptions are counted and the input dropped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Optional[Iterable[Any]]],
+        workers: int = 1,
+        queue_size: int = 100,
+        batch_size: int = 1,
+        max_wait: Optional[float] = 1.0,
+    ):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.stats = StageStats()
+        self.lock = threading.Lock()
+
+
+class Pipeline:
+    """Chain of stages connected by bounded queues.
+
+    Each stage reads from its own queue of at most queue_size items, so a
+    slow stage blocks the ones before it instead of letting work pile up in
+    memory. Queue depths are sampled while the pipeline runs to show where
+    items wait.
+    """
+
+    def __init__(self, stages: List[Stage], sample_interval: float = 0.5):
+        self.stages = stages
+        self.sample_interval = sample_interval
+        self.seconds = 0.0
+        self._queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+
+    def run(self, items: Iterable[Any]) -> None:
+        """Feed items to the first stage and block until every stage has drained."""
+        start = time.perf_counter()
+        finished = threading.Event()
+        threads = [threading.Thread(target=self._feed, args=(items,), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(target=self._work, args=(index, remaining), daemon=True))
+        monitor = threading.Thread(target=self._sample, args=(finished,), daemon=True)
+
+        for thread in threads:
+            thread.start()
+        monitor.start()
+        for thread in threads:
+            thread.join()
+        finished.set()
+        monitor.join()
+        self.seconds = time.perf_counter() - start
+
+    def _feed(self, items: Iterable[Any]) -> None:
+        try:
+            for item in items:
+                self._queues[0].put(item)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            self._queues[0].put(_DONE)
+
+    def _next_batch(self, stage: Stage, inbox: queue.Queue) -> tuple:
+        """Take the next item or batch from a stage's queue; the flag is True once input has ended."""
+        item = inbox.get()
+        if item is _DONE:
+            return None, True
+        if stage.batch_size == 1:
+            return item, False
+
+        batch = [item]
+        deadline = None if stage.max_wait is None else time.monotonic() + stage.max_wait
+        while len(batch) < stage.batch_size:
+            try:
+                item = inbox.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self, index: int, remaining: List[int]) -> None:
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self._queues) else None
+        done = False
+        while not done:
+            work, done = self._next_batch(stage, inbox)
+            if work is not None:
+                self._process(stage, work, outbox)
+
+        # Let the stage's other workers see the end of input, and the last one
+        # to finish pass it on
+        inbox.put(_DONE)
+        with stage.lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last and outbox is not None:
+            outbox.put(_DONE)
+
+    def _process(self, stage: Stage, work: Any, outbox: Optional[queue.Queue]) -> None:
+        count = len(work) if stage.batch_size > 1 else 1
+        start = time.perf_counter()
+        outputs = 0
+        errors = 0
+        try:
+            for output in stage.fn(work) or ():
+                outputs += 1
+                if outbox is not None:
+                    outbox.put(output)
+        except Exception as e:
+            errors = 1
+            print(f"Stage '{stage.name}' failed on {count} items: {type(e).__name__}: {str(e)}")
+            traceback.print_exc()
+        with stage.lock:
+            stage.stats.items_in += count
+            stage.stats.items_out += outputs
+            stage.stats.errors += errors
+            stage.stats.busy_seconds += time.perf_counter() - start
+
+    def _sample(self, finished: threading.Event) -> None:
+        while not finished.wait(self.sample_interval):
+            for stage, inbox in zip(self.stages, self._queues):
+                depth = inbox.qsize()
+                with stage.lock:
+                    stage.stats.max_queue_depth = max(stage.stats.max_queue_depth, depth)
+                    stage.stats.queue_depth_total += depth
+                    stage.stats.queue_depth_samples += 1
+
+    def report(self) -> None:
+        """Print per-stage throughput, utilization and input queue depth."""
+        print(f"\nPipeline finished in {self.seconds:.1f}s")
+        print(f"{'stage':<10} {'workers':>7} {'in':>7} {'out':>7} {'errors':>6} {'in/sec':>8} {'busy':>6} {'queue avg':>9} {'max':>5}")
+        for stage in self.stages:
+            stats = stage.stats
+            rate = stats.items_in / self.seconds if self.seconds else 0.0
+            busy = stats.busy_seconds / (self.seconds * stage.workers) if self.seconds else 0.0
+            print(
+                f"{stage.name:<10} {stage.workers:>7} {stats.items_in:>7} {stats.items_out:>7} {stats.errors:>6} "
+                f"{rate:>8.1f} {busy:>6.0%} {stats.mean_queue_depth:>9.1f} {stats.max_queue_depth:>5}"
+            )
@@ -0,0 +1,188 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Per-minute budgets shared by every thread in the process; 0 disables a limit.
+# Defaults match OpenAI's first usage tier for gpt-4o-mini and text-embedding-3-small.
+RATE_LIMITS = {
+    "llm": (
+        int(os.getenv("LLM_REQUESTS_PER_MINUTE", 500)),
+        int(os.getenv("LLM_TOKENS_PER_MINUTE", 200_000)),
+    ),
+    "embedding": (
+        int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", 3000)),
+        int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", 1_000_000)),
+    ),
+}
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before retrying: Retry-After if the API sent it, else jittered exponential backoff."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(60.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute.
+
+    Each bucket holds up to one minute of budget and refills continuously, so
+    short bursts are allowed while the per-minute average stays within quota.
+    acquire() blocks the calling thread until both buckets can cover the call.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.calls = 0
+        self.wait_seconds = 0.0
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Wait until one request of the given token count fits the budget; returns seconds waited."""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                # A single call larger than the whole bucket waits for a full bucket
+                needed = min(tokens, self.tokens_per_minute)
+                waits = []
+                if self.requests_per_minute and self._requests < 1:
+                    waits.append((1 - self._requests) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute and self._tokens < needed:
+                    waits.append((needed - self._tokens) * 60 / self.tokens_per_minute)
+                if not waits:
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    if self.tokens_per_minute:
+                        self._tokens -= needed
+                    waited = now - start
+                    self.calls += 1
+                    self.wait_seconds += waited
+                    return waited
+            time.sleep(max(waits))
+
+    def summary(self) -> str:
+        return f"{self.calls} calls, {self.wait_seconds:.1f}s waiting for quota"
+
+
+class AdaptiveConcurrencyLimiter:
+    """Caps calls in flight, adjusting the cap to how the API is coping.
+
+    The cap grows by one after a full cap's worth of successful calls while
+    latency stays within latency_tolerance of the best seen and none of the
+    last window calls failed. It halves on a 429 or when errors exceed
+    max_error_rate, at most once per cooldown so a burst of failures from
+    calls already in flight counts once.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: int = 16,
+        window: int = 20,
+        max_error_rate: float = 0.1,
+        latency_tolerance: float = 2.0,
+        cooldown: float = 5.0,
+    ):
+        self.limit = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_error_rate = max_error_rate
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.peak = self.limit
+        self.calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self._in_flight = 0
+        self._results = deque(maxlen=window)
+        self._latency = None
+        self._best_latency = None
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Block until a call slot is free under the current cap."""
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float, failed: bool = False, rate_limited: bool = False) -> None:
+        """Free a slot and feed the call's outcome back into the cap."""
+        with self._condition:
+            self._in_flight -= 1
+            self.calls += 1
+            self._results.append(failed)
+            if rate_limited:
+                self.rate_limited += 1
+            if failed:
+                self.failures += 1
+                error_rate = sum(self._results) / len(self._results)
+                if rate_limited or (len(self._results) >= 5 and error_rate > self.max_error_rate):
+                    self._decrease()
+            else:
+                self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+                self._best_latency = min(self._best_latency or self._latency, self._latency)
+                self._successes += 1
+                healthy = self._latency <= self._best_latency * self.latency_tolerance
+                if healthy and self._successes >= self.limit and not any(self._results) and self.limit < self.maximum:
+                    self.limit += 1
+                    self.peak = max(self.peak, self.limit)
+                    self._successes = 0
+            self._condition.notify_all()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit // 2)
+        self._successes = 0
+        self._results.clear()
+
+    def summary(self) -> str:
+        return (
+            f"concurrency {self.limit} (peak {self.peak}), {self.calls} calls, "
+            f"{self.failures} failed, {self.rate_limited} rate-limited"
+        )
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """Return the process-wide limiter for a budget in RATE_LIMITS."""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(*RATE_LIMITS[name])
+        return _limiters[name]
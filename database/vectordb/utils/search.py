@@ -0,0 +1,16 @@
+from dotenv import load_dotenv
+
+from utils.backend_modules import load_backend_module
+
+load_dotenv()
+
+# Shared with the backend so the chat app and retrieval comparison rank chunks
+# exactly as lesson plan generation does
+_module = load_backend_module("search")
+
+VECTOR_SEARCH_NPROBES = _module.VECTOR_SEARCH_NPROBES
+VECTOR_SEARCH_REFINE_FACTOR = _module.VECTOR_SEARCH_REFINE_FACTOR
+SEARCH_MODES = _module.SEARCH_MODES
+SEARCH_MODE = _module.SEARCH_MODE
+RRF_K = _module.RRF_K
+search_chunks = _module.search_chunks
@@ -1,33 +1,117 @@
-from typing import Dict, List, Tuple
+import hashlib
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
 
 from tiktoken import get_encoding
 from transformers.tokenization_utils_base import PreTrainedTokenizerBase
 
+# Texts whose token ids are kept in memory; HybridChunker re-tokenizes the same
+# text many times while merging peers
+TOKENIZER_CACHE_SIZE = int(os.getenv("TOKENIZER_CACHE_SIZE", 4096))
+
 
 # Create a wrapper class to make OpenAI's tokenizer compatible with the HybridChunker interface
 class OpenAITokenizerWrapper(PreTrainedTokenizerBase):
-    """Minimal wrapper for OpenAI's tokenizer."""
+    """Minimal wrapper for OpenAI's tokenizer.
+
+    Token ids are memoized by a hash of the text in a bounded LRU cache, and
+    encode/count_tokens work on the integer ids directly. Tokens are the
+    decimal strings of their ids, as HybridChunker only needs their count.
+    """
 
     def __init__(
-        self, model_name: str = "cl100k_base", max_length: int = 8191, **kwargs
+        self, model_name: str = "cl100k_base", max_length: int = 8191, cache_size: int = TOKENIZER_CACHE_SIZE, **kwargs
     ):
         """Initialize the tokenizer.
 
         Args:
             model_name: The name of the OpenAI encoding to use
             max_length: Maximum sequence length
+            cache_size: Number of texts whose token ids are memoized
         """
         super().__init__(model_max_length=max_length, **kwargs)
         self.tokenizer = get_encoding(model_name)
         self._vocab_size = self.tokenizer.max_token_value
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[bytes, array]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._token_strings: List[str] | None = None
+        self._vocab: Dict[str, int] | None = None
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _lookup(self, key: bytes) -> array | None:
+        with self._cache_lock:
+            ids = self._cache.get(key)
+            if ids is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return ids
+
+    def _store(self, key: bytes, ids: List[int]) -> array:
+        stored = array("I", ids)
+        with self._cache_lock:
+            self._cache[key] = stored
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return stored
+
+    def _ids(self, text: str) -> array:
+        key = self._key(text)
+        ids = self._lookup(key)
+        if ids is None:
+            ids = self._store(key, self.tokenizer.encode_ordinary(text))
+        return ids
+
+    def encode(self, text: str, text_pair: str | None = None, add_special_tokens: bool = True, **kwargs) -> List[int]:
+        """Token ids of a text (and optional pair); tiktoken adds no special tokens."""
+        ids = list(self._ids(text))
+        if text_pair is not None:
+            ids.extend(self._ids(text_pair))
+        return ids
+
+    def encode_batch(self, texts: Sequence[str]) -> List[List[int]]:
+        """Token ids of many texts, encoding cache misses in parallel."""
+        keys = [self._key(text) for text in texts]
+        found = [self._lookup(key) for key in keys]
+        missing = {key: text for key, text, ids in zip(keys, texts, found) if ids is None}
+        if missing:
+            encoded = self.tokenizer.encode_ordinary_batch(list(missing.values()))
+            stored = {key: self._store(key, ids) for key, ids in zip(missing, encoded)}
+            found = [ids if ids is not None else stored[key] for key, ids in zip(keys, found)]
+        return [list(ids) for ids in found]
+
+    def count_tokens(self, text: str) -> int:
+        return len(self._ids(text))
+
+    def count_tokens_batch(self, texts: Sequence[str]) -> List[int]:
+        return [len(ids) for ids in self.encode_batch(texts)]
 
     def tokenize(self, text: str, **kwargs) -> List[str]:
         """Main method used by HybridChunker."""
-        return [str(t) for t in self.tokenizer.encode(text)]
+        if self._token_strings is None:
+            self._token_strings = [str(i) for i in range(self.tokenizer.n_vocab)]
+        token_strings = self._token_strings
+        return [token_strings[i] for i in self._ids(text)]
 
     def _tokenize(self, text: str) -> List[str]:
         return self.tokenize(text)
 
+    def convert_tokens_to_ids(self, tokens: str | List[str]) -> int | List[int]:
+        if isinstance(tokens, str):
+            return int(tokens)
+        return [int(token) for token in tokens]
+
     def _convert_token_to_id(self, token: str) -> int:
         return int(token)
 
@@ -35,7 +119,9 @@ class OpenAITokenizerWrapper(PreTrainedTokenizerBase):
         return str(index)
 
     def get_vocab(self) -> Dict[str, int]:
-        return dict(enumerate(range(self.vocab_size)))
+        if self._vocab is None:
+            self._vocab = dict(enumerate(range(self.vocab_size)))
+        return self._vocab
 
     @property
     def vocab_size(self) -> int: